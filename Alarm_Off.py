@@ -1,10 +1,8 @@
 import configparser
-from ControlSwitch import control_shelly_switch
-import time
+from ControlSwitch import control_shelly_switch, RELAY_CONFIG
 import pygame
 import sys
 import os
-import pandas as pd
 
 from translations import get_translations_cached as load_translations, get_message
 
@@ -29,7 +27,14 @@ def alarm_off(user_lang, system, message=True):
 
     for attempt in range(3):
         try:
-            control_shelly_switch(ip_off)
+            if not system.wait_for(system.run_in_background(control_shelly_switch, ip_off)):
+                if RELAY_CONFIG['alarm_relay_required']:
+                    raise ConnectionError(f"relay {ip_off} did not accept the command")
+                # Report the failure but let the gate open, as before
+                print(f"Alarm relay {ip_off} did not accept the command, continuing")
+                if message:
+                    system.show_message(f"{get_message(25, translations)} relay {ip_off}", 2)  # An error occurred:
+                return 1
             
             #turning off alarm check. Uncomment when check_alarm_state() corrected
             #alarm_state = check_alarm_state()
@@ -41,14 +46,14 @@ def alarm_off(user_lang, system, message=True):
                 return 1
             
             if attempt < 2:
-                time.sleep(2)
+                system.pump(2)
         
         except Exception as e:
             error_message = f"{get_message(25, translations)} {str(e)}"  # An error occurred:
             if attempt == 2:  # Show message only on the last attempt
                 system.show_message(error_message, 5)
             if attempt < 2:
-                time.sleep(5)
+                system.pump(5)
             else:
                 return -1
     
@@ -1,11 +1,9 @@
 import configparser
-from ControlSwitch import control_shelly_switch
+from ControlSwitch import control_shelly_switch, RELAY_CONFIG
 # from ReadIFTTT import check_alarm_state  # Not used in current version
-import time
 import pygame
 import sys
 import os
-import pandas as pd
 
 from translations import get_translations_cached as load_translations, get_message
 
@@ -35,7 +33,7 @@ def alarm_on(NightMode, user_lang, system):
     if alarm_state == 0:  # Alarm is off
         from Alarm_Off import alarm_off
         alarm_off(user_lang, system, False)    #Comment when check_alarm_state() is corrected
-        time.sleep(2)
+        system.pump(2)
         
         return set_alarm(ip_relay, translations, system)
     elif alarm_state == 1:  # Alarm is already on
@@ -46,7 +44,12 @@ def alarm_on(NightMode, user_lang, system):
 
 def set_alarm(ip_relay, translations, system):
     try:
-        control_shelly_switch(ip_relay)
+        if not system.wait_for(system.run_in_background(control_shelly_switch, ip_relay)):
+            if RELAY_CONFIG['alarm_relay_required']:
+                raise ConnectionError(f"relay {ip_relay} did not accept the command")
+            print(f"Alarm relay {ip_relay} did not accept the command, continuing")
+            system.show_message(f"{get_message(29, translations)} relay {ip_relay}", 2)  # An error occurred when setting alarm
+            return 1
         alarm_state = 1 # delete when alarm_state will be controlled
         
         for attempt in range(3):
@@ -56,7 +59,7 @@ def set_alarm(ip_relay, translations, system):
                 system.show_message(get_message(27, translations), 2)  # The alarm is set!
                 return 1
             
-            time.sleep(2)
+            system.pump(2)
             
         system.show_message(get_message(28, translations), 5)  # Failed to set the alarm
         return 0
@@ -0,0 +1,114 @@
+import threading
+import time
+import numpy as np
+
+
+class CameraStream:
+    """
+    Background camera capture stage.
+
+    A dedicated thread keeps grabbing frames from the camera into a small ring
+    of pre-allocated numpy arrays, so the consumer always gets the newest frame
+    instead of a stale backlog sitting in the driver queue.
+    """
+
+    def __init__(self, video_capture, width, height, buffer_size=3):
+        """
+        Args:
+            video_capture: Opened cv2.VideoCapture instance
+            width: Camera frame width
+            height: Camera frame height
+            buffer_size: Number of ring buffer slots (at least 3)
+        """
+        self.video_capture = video_capture
+        self.buffer_size = max(3, buffer_size)
+        self.frames = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(self.buffer_size)]
+        self.timestamps = [0.0] * self.buffer_size
+
+        self.latest_index = -1     # Slot holding the newest complete frame
+        self.reserved_index = -1   # Slot currently handed out to the consumer
+        self.last_read_time = 0.0  # Timestamp of the last frame handed out
+        self.drop_before = 0.0     # Frames captured before this moment are ignored
+
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """Start the capture thread"""
+        if self.running:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def _next_write_index(self):
+        """Pick a slot that is neither the newest frame nor the one the consumer holds"""
+        for index in range(self.buffer_size):
+            if index != self.latest_index and index != self.reserved_index:
+                return index
+        return 0
+
+    def _capture_loop(self):
+        while self.running:
+            with self.condition:
+                index = self._next_write_index()
+
+            ret, frame = self.video_capture.read(self.frames[index])
+            captured_at = time.monotonic()
+
+            if not ret or frame is None:
+                time.sleep(0.01)
+                continue
+
+            # The driver returns a new array if the frame size changed
+            if frame is not self.frames[index]:
+                self.frames[index] = frame
+
+            with self.condition:
+                self.timestamps[index] = captured_at
+                self.latest_index = index
+                self.condition.notify_all()
+
+    def _has_new_frame(self):
+        if self.latest_index < 0:
+            return False
+        captured_at = self.timestamps[self.latest_index]
+        return captured_at > self.last_read_time and captured_at > self.drop_before
+
+    def read(self, timeout=1.0):
+        """
+        Get the newest frame captured since the previous read.
+
+        The returned array is owned by the ring buffer and stays valid until
+        the next call to read().
+
+        Args:
+            timeout: Maximum time in seconds to wait for a fresh frame
+
+        Returns:
+            Tuple (ret, frame) in the same form as cv2.VideoCapture.read()
+        """
+        with self.condition:
+            if not self.condition.wait_for(self._has_new_frame, timeout):
+                return False, None
+            index = self.latest_index
+            self.reserved_index = index
+            self.last_read_time = self.timestamps[index]
+            return True, self.frames[index]
+
+    def flush(self):
+        """Drop every frame captured before now without touching the camera"""
+        with self.condition:
+            self.drop_before = time.monotonic()
+
+    def isOpened(self):
+        return self.video_capture is not None and self.video_capture.isOpened()
+
+    def stop(self):
+        """Stop the capture thread"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+            self.thread = None
@@ -0,0 +1,88 @@
+import socket
+import threading
+
+TELEGRAM_HOST = ("api.telegram.org", 443)
+SHELLY_PORT = 80
+
+
+def probe(host, port, timeout):
+    """True if a TCP connection to host:port can be opened within timeout"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+class ConnectivityMonitor:
+    """
+    Background health probing of Telegram and the Shelly relays.
+
+    A thread connects to the Telegram API and to every relay every
+    probe_interval seconds and caches the results, so the kiosk reads a
+    boolean instead of probing the network while a visitor waits. Listeners
+    are called (from the monitor thread) when a target goes up or down.
+    """
+
+    def __init__(self, relay_ips, probe_interval=30.0, probe_timeout=2.0):
+        """
+        Args:
+            relay_ips: Addresses of the Shelly relays
+            probe_interval: Seconds between probe rounds
+            probe_timeout: Connect timeout of a single probe
+        """
+        self.relay_ips = list(dict.fromkeys(relay_ips))
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+
+        # Targets are assumed reachable until the first probe says otherwise
+        self.online = True
+        self.relays = {ip: True for ip in self.relay_ips}
+        self.listeners = []
+
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
+            self.thread.start()
+        return self
+
+    def add_listener(self, callback):
+        """Call callback(target, reachable) on every change; target is "telegram" or a relay IP"""
+        self.listeners.append(callback)
+
+    def is_online(self):
+        """Last known reachability of the Telegram API"""
+        return self.online
+
+    def relay_status(self, ip):
+        """Last known reachability of a relay (True for unknown addresses)"""
+        return self.relays.get(ip, True)
+
+    def _publish(self, target, reachable):
+        print(f"Connectivity: {target} is {'reachable' if reachable else 'unreachable'}")
+        for callback in self.listeners:
+            try:
+                callback(target, reachable)
+            except Exception as e:
+                print(f"Connectivity listener failed: {e}")
+
+    def _monitor_loop(self):
+        while not self.stopped.is_set():
+            online = probe(*TELEGRAM_HOST, self.probe_timeout)
+            if online != self.online:
+                self.online = online
+                self._publish("telegram", online)
+
+            for ip in self.relay_ips:
+                reachable = probe(ip, SHELLY_PORT, self.probe_timeout)
+                if reachable != self.relays[ip]:
+                    self.relays[ip] = reachable
+                    self._publish(ip, reachable)
+
+            self.stopped.wait(self.probe_interval)
+
+    def stop(self):
+        self.stopped.set()
@@ -1,40 +1,148 @@
 import requests
 import time
+import threading
+import configparser
+
+
+def load_relay_config():
+    config = configparser.ConfigParser()
+    config.read('gpp.ini')
+    return {
+        'timeout': (config.getfloat('Relay', 'connect_timeout', fallback=1.0),
+                    config.getfloat('Relay', 'read_timeout', fallback=2.0)),
+        'retries': config.getint('Relay', 'retries', fallback=2),
+        'backoff': config.getfloat('Relay', 'backoff', fallback=0.3),
+        'pulse_time': config.getfloat('Relay', 'pulse_time', fallback=0.2),
+        'on_device_pulse': config.getboolean('Relay', 'on_device_pulse', fallback=True),
+        'alarm_relay_required': config.getboolean('Relay', 'alarm_relay_required', fallback=False),
+    }
+
+RELAY_CONFIG = load_relay_config()
+
+# One keep-alive HTTP session shared by all relays
+_session = requests.Session()
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class ShellyError(requests.exceptions.RequestException):
+    """The relay answered but rejected the command"""
+
 
 class Shelly1Plus:
-    def __init__(self, ip_address):
+    """
+    Client for a Shelly 1 Plus (Gen2 RPC API) relay.
+
+    Requests go through a shared keep-alive session with explicit connect
+    and read timeouts, and failed requests are retried with exponential
+    backoff before the error is raised.
+    """
+
+    def __init__(self, ip_address, session=None, timeout=None, retries=None, backoff=None):
+        """
+        Args:
+            ip_address: Address of the relay
+            session: requests.Session to use (defaults to the shared one)
+            timeout: (connect, read) timeout in seconds
+            retries: Extra attempts after a failed request
+            backoff: Delay before the first retry, doubled for each further one
+        """
         self.base_url = f"http://{ip_address}"
+        self.session = session or _session
+        self.timeout = timeout or RELAY_CONFIG['timeout']
+        self.retries = RELAY_CONFIG['retries'] if retries is None else retries
+        self.backoff = RELAY_CONFIG['backoff'] if backoff is None else backoff
+        self.toggle_after_supported = True
 
-    def turn_on(self):
-        return self._send_command("on")
+    def turn_on(self, toggle_after=None):
+        """Switch on; with toggle_after the device itself switches off again after that many seconds"""
+        return self._send_command("on", toggle_after)
 
     def turn_off(self):
         return self._send_command("off")
 
-    def _send_command(self, command):
+    def pulse(self, duration=None, on_device=None):
+        """
+        Close the relay for duration seconds.
+
+        With on_device the pulse is a single Switch.Set call using Shelly's
+        toggle_after, so the timing does not depend on this host or the network.
+        Firmware that rejects toggle_after falls back to an on/off pair.
+        """
+        duration = RELAY_CONFIG['pulse_time'] if duration is None else duration
+        on_device = RELAY_CONFIG['on_device_pulse'] if on_device is None else on_device
+
+        if on_device and self.toggle_after_supported:
+            result = self.turn_on(toggle_after=duration)
+            if "code" not in result:
+                return result
+            print(f"Relay {self.base_url} does not accept toggle_after: {result.get('message')}")
+            self.toggle_after_supported = False
+
+        self._check(self.turn_on())
+        time.sleep(duration)
+        return self._check(self.turn_off())
+
+    def _check(self, result):
+        """Raise ShellyError if the relay rejected a command"""
+        if "code" in result:
+            raise ShellyError(f"Relay {self.base_url} rejected the command: {result.get('message')}")
+        return result
+
+    def _send_command(self, command, toggle_after=None):
         url = f"{self.base_url}/rpc/Switch.Set"
         payload = {
             "id": 0,
             "on": command == "on"
         }
-        response = requests.post(url, json=payload)
-        return response.json()
+        if toggle_after is not None:
+            payload["toggle_after"] = toggle_after
+
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+                # Gen2 RPC errors come back as a non-2xx status with a {"code", "message"} body
+                try:
+                    result = response.json()
+                except ValueError:
+                    result = {}
+                if not isinstance(result, dict):
+                    result = {}
+                if not response.ok and "code" not in result:
+                    result = {"code": response.status_code, "message": response.text}
+                return result
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                print(f"Relay {self.base_url} did not answer ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay *= 2
+
+
+def get_shelly(ip_address):
+    """Shared client for a relay, so the keep-alive connection is reused"""
+    with _clients_lock:
+        if ip_address not in _clients:
+            _clients[ip_address] = Shelly1Plus(ip_address)
+        return _clients[ip_address]
 
 def control_shelly_switch(ip_address):
-    shelly = Shelly1Plus(ip_address)
+    """
+    Pulse a relay.
+
+    Returns:
+        True if the relay accepted the command
+    """
+    shelly = get_shelly(ip_address)
     
     try:
-        # Turn on the switch
-        result = shelly.turn_on()
-        
-        # Wait for 0.2 seconds
-        time.sleep(0.2)
-        
-        # Turn off the switch
-        result = shelly.turn_off()
+        shelly.pulse()
+        return True
         
     except requests.exceptions.RequestException as e:
         print(f"An error occurred in switch: {e}")
+        return False
 
 if __name__ == "__main__":
     # This code will only run if the script is executed directly
@@ -44,4 +152,4 @@ if __name__ == "__main__":
     ip_gate = "192.168.2.141"
     control_shelly_switch(ip_gate)
     #time.sleep(2)
-    #control_shelly_switch(ip_off)
\ No newline at end of file
+    #control_shelly_switch(ip_off)
@@ -0,0 +1,164 @@
+import os
+import pickle
+import hashlib
+import multiprocessing
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from FaceEncodings import has_encoding_column
+
+CACHE_VERSION = 1
+CHUNK_SIZE = 32  # Rows fetched from SQLite at a time
+
+
+def photo_hash(photo_data):
+    """Content hash of a photo BLOB"""
+    return hashlib.md5(photo_data).hexdigest()
+
+
+def encode_safely(encode_photo, photo_data):
+    """Run encode_photo, treating an unreadable photo as one without a face"""
+    try:
+        return encode_photo(photo_data)
+    except Exception as e:
+        print(f"Error encoding photo: {e}")
+        return None
+
+
+class EncodingCache:
+    """
+    Persistent per-photo face encoding cache.
+
+    Used for photos whose encoding was not precomputed into people.db by
+    manageDB.py (older databases, or a workstation without dlib). Entries are
+    keyed by the photos.id row id and remember the content hash of photo_data,
+    so after an edit in manageDB.py only added or changed photos have to be
+    encoded again. Photos without a detectable face are cached too
+    (with encoding None) so they are not retried on every boot.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.entries = {}  # photo_id -> (photo_hash, person_id, encoding or None)
+        self.changed = False
+
+    def load(self):
+        """Load cache entries from disk, starting empty if the file is missing or unreadable"""
+        self.entries = {}
+        self.changed = False
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = data["entries"]
+            else:
+                print("Encoding cache has an old format. Rebuilding it.")
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, KeyError) as e:
+            print(f"Could not read encoding cache: {e}")
+
+    def save(self):
+        """Write the cache atomically if anything changed"""
+        if not self.changed:
+            return
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"version": CACHE_VERSION, "entries": self.entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path)
+        self.changed = False
+
+    def refresh(self, db_path, encode_photo, workers=1, progress_callback=None):
+        """
+        Bring the cache in sync with the photos that have no stored encoding.
+
+        Rows are streamed from SQLite in chunks, and the photos of each chunk
+        that need encoding are fanned out over a process pool.
+
+        Args:
+            db_path: Path to people.db
+            encode_photo: Picklable callable taking photo_data bytes and
+                returning a 128-d encoding, or None if no face was found
+            workers: Number of encoding processes (1 encodes in this process)
+            progress_callback: Optional callable(done, total) called after
+                every chunk that needed encoding
+
+        Returns:
+            Tuple (encodings, ids) of all photos with a usable encoding
+        """
+        self.load()
+
+        seen = set()
+        encoded = 0
+        executor = None
+        if workers > 1:
+            # Runs while the camera and Telegram threads are alive; forking the
+            # process could copy a lock another thread holds, so start clean ones
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+        conn = sqlite3.connect(db_path)
+        try:
+            where = " WHERE photos.encoding IS NULL" if has_encoding_column(conn) else ""
+            total = conn.execute(
+                "SELECT COUNT(*) FROM persons JOIN photos ON persons.id = photos.person_id" + where
+            ).fetchone()[0]
+            cursor = conn.execute("""
+                SELECT photos.id, persons.id, photos.photo_data
+                FROM persons JOIN photos ON persons.id = photos.person_id
+            """ + where)
+
+            while True:
+                rows = cursor.fetchmany(CHUNK_SIZE)
+                if not rows:
+                    break
+
+                pending = []
+                for photo_id, person_id, photo_data in rows:
+                    seen.add(photo_id)
+                    content_hash = photo_hash(photo_data)
+                    entry = self.entries.get(photo_id)
+
+                    if entry is None or entry[0] != content_hash:
+                        pending.append((photo_id, person_id, content_hash, photo_data))
+                    elif entry[1] != person_id:
+                        self.entries[photo_id] = (content_hash, person_id, entry[2])
+                        self.changed = True
+
+                if not pending:
+                    continue
+
+                if executor:
+                    futures = [executor.submit(encode_safely, encode_photo, photo_data)
+                               for _, _, _, photo_data in pending]
+                    results = [future.result() for future in futures]
+                else:
+                    results = [encode_safely(encode_photo, photo_data) for _, _, _, photo_data in pending]
+
+                for (photo_id, person_id, content_hash, _), encoding in zip(pending, results):
+                    self.entries[photo_id] = (content_hash, person_id, encoding)
+                encoded += len(pending)
+                self.changed = True
+
+                if progress_callback:
+                    progress_callback(len(seen), total)
+        finally:
+            conn.close()
+            if executor:
+                executor.shutdown()
+
+        removed = [photo_id for photo_id in self.entries if photo_id not in seen]
+        for photo_id in removed:
+            del self.entries[photo_id]
+        if removed:
+            self.changed = True
+
+        self.save()
+        print(f"Encoding cache: {len(seen)} photos, {encoded} encoded, {len(removed)} removed")
+
+        encodings = []
+        ids = []
+        for _, person_id, encoding in self.entries.values():
+            if encoding is not None:
+                encodings.append(encoding)
+                ids.append(person_id)
+        return encodings, ids
@@ -0,0 +1,69 @@
+import queue
+import sqlite3
+import threading
+
+
+class EventLogger:
+    """
+    Asynchronous event log writer.
+
+    Events are put on a bounded queue and written to events.db by a single
+    background thread, which batches everything waiting in the queue into one
+    transaction. The kiosk goes back to scanning without waiting for the
+    SD card.
+    """
+
+    def __init__(self, database, max_queue=64, batch_size=16):
+        """
+        Args:
+            database: GateDatabase instance
+            max_queue: Maximum number of events waiting to be written
+            batch_size: Maximum number of events written per transaction
+        """
+        self.database = database
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.thread.start()
+
+    def log(self, date, time, picture, name, surname, action_code):
+        """
+        Queue an event without blocking.
+
+        Args:
+            picture: Already encoded JPEG bytes (or None)
+        """
+        try:
+            self.queue.put_nowait((date, time, picture, name, surname, action_code))
+        except queue.Full:
+            print(f"Event log queue is full, dropping event for {name} {surname} ({action_code})")
+
+    def _writer_loop(self):
+        running = True
+        while running:
+            event = self.queue.get()
+            if event is None:
+                break
+
+            batch = [event]
+            while len(batch) < self.batch_size:
+                try:
+                    event = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if event is None:
+                    running = False
+                    break
+                batch.append(event)
+
+            try:
+                self.database.log_events(batch)
+            except sqlite3.Error as e:
+                print(f"Error writing {len(batch)} events: {e}")
+
+    def stop(self, timeout=5):
+        """Flush pending events and stop the writer thread"""
+        self.queue.put(None)
+        self.thread.join(timeout=timeout)
+        if self.thread.is_alive():
+            print("Event logger did not finish writing pending events")
@@ -0,0 +1,87 @@
+import cv2
+
+# All detectors take an RGB numpy image and return a list of
+# (top, right, bottom, left) boxes, the format used by face_recognition.
+# Detectors with accepts_grayscale also take a single-channel image.
+# face_recognition (dlib and its models) is imported on first use, so creating
+# a detector is cheap and the import can happen in a warm-up thread.
+
+
+class HogDetector:
+    """dlib HOG detector: fast, misses small or turned faces"""
+
+    name = "hog"
+    accepts_grayscale = True
+
+    def detect(self, rgb_image):
+        import face_recognition
+        return face_recognition.face_locations(rgb_image, model='hog')
+
+
+class CnnDetector:
+    """dlib CNN detector: accurate, slow on a Raspberry Pi"""
+
+    name = "cnn"
+    accepts_grayscale = False
+
+    def detect(self, rgb_image):
+        import face_recognition
+        return face_recognition.face_locations(rgb_image, model='cnn')
+
+
+class DnnDetector:
+    """
+    OpenCV DNN detector using a YuNet ONNX model (cv2.FaceDetectorYN).
+
+    The model file is not part of the repository; download
+    face_detection_yunet_2023mar.onnx from the OpenCV model zoo and point
+    dnn_model in gpp.ini at it.
+    """
+
+    name = "dnn"
+    accepts_grayscale = False
+
+    def __init__(self, model_path, score_threshold=0.8, nms_threshold=0.3, top_k=20):
+        self.detector = cv2.FaceDetectorYN.create(model_path, "", (320, 320), score_threshold, nms_threshold, top_k)
+        self.input_size = None
+
+    def detect(self, rgb_image):
+        height, width = rgb_image.shape[:2]
+        if self.input_size != (width, height):
+            self.detector.setInputSize((width, height))
+            self.input_size = (width, height)
+
+        _, faces = self.detector.detect(cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+
+        boxes = []
+        for x, y, w, h in faces[:, :4]:
+            top = max(0, int(y))
+            left = max(0, int(x))
+            bottom = min(height, int(y + h))
+            right = min(width, int(x + w))
+            if bottom > top and right > left:
+                boxes.append((top, right, bottom, left))
+        return boxes
+
+
+def create_detector(name, dnn_model=None, dnn_score_threshold=0.8):
+    """
+    Create a face detector by name.
+
+    Args:
+        name: 'hog', 'cnn' or 'dnn'
+        dnn_model: Path to the YuNet ONNX model, required for 'dnn'
+        dnn_score_threshold: Minimum confidence for DNN detections
+    """
+    name = name.strip().lower()
+    if name == "hog":
+        return HogDetector()
+    if name == "cnn":
+        return CnnDetector()
+    if name == "dnn":
+        if not dnn_model:
+            raise ValueError("The dnn detector needs dnn_model set in gpp.ini")
+        return DnnDetector(dnn_model, dnn_score_threshold)
+    raise ValueError(f"Unknown face detector '{name}'. Use hog, cnn or dnn.")
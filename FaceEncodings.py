@@ -0,0 +1,75 @@
+import io
+import numpy as np
+
+# Encodings are stored in photos.encoding as raw float32 bytes.
+# NULL means "not computed yet", an empty BLOB means "no face found".
+ENCODING_SIZE = 128
+ENCODING_DTYPE = np.float32
+NO_FACE = b''
+
+
+def encode_photo(photo_data):
+    """Compute the face encoding of a photo BLOB, or None if no face is found"""
+    # Imported here so the BLOB helpers below work without dlib installed
+    import face_recognition
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(photo_data))
+    image = image.convert("RGB")
+    image_np = np.array(image)
+    face_encodings = face_recognition.face_encodings(image_np)
+    if face_encodings:
+        return face_encodings[0]
+    return None
+
+
+def encoding_to_blob(encoding):
+    """Serialize an encoding for the photos.encoding column"""
+    if encoding is None:
+        return NO_FACE
+    return np.asarray(encoding, dtype=ENCODING_DTYPE).tobytes()
+
+
+def blob_to_encoding(blob):
+    """Deserialize a photos.encoding value, returning None for missing or empty encodings"""
+    if not blob or len(blob) != ENCODING_SIZE * np.dtype(ENCODING_DTYPE).itemsize:
+        return None
+    return np.frombuffer(blob, dtype=ENCODING_DTYPE)
+
+
+def has_encoding_column(conn):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(photos)")]
+    return 'encoding' in columns
+
+
+def ensure_encoding_column(conn):
+    """Add the encoding column to databases created before it existed"""
+    if not has_encoding_column(conn):
+        conn.execute("ALTER TABLE photos ADD COLUMN encoding BLOB")
+        conn.commit()
+        print("Added encoding column to photos table")
+
+
+def load_precomputed_encodings(conn):
+    """
+    Load all encodings stored in people.db with a single query.
+
+    Returns:
+        Tuple (encodings, ids); photos without a stored encoding are skipped
+    """
+    if not has_encoding_column(conn):
+        return [], []
+
+    encodings = []
+    ids = []
+    rows = conn.execute("""
+        SELECT persons.id, photos.encoding
+        FROM persons JOIN photos ON persons.id = photos.person_id
+        WHERE length(photos.encoding) > 0
+    """)
+    for person_id, blob in rows:
+        encoding = blob_to_encoding(blob)
+        if encoding is not None:
+            encodings.append(encoding)
+            ids.append(person_id)
+    return encodings, ids
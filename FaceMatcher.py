@@ -0,0 +1,123 @@
+from collections import namedtuple
+import numpy as np
+
+# person_id is None when the best match is farther than the tolerance
+MatchResult = namedtuple('MatchResult', ['person_id', 'distance', 'margin'])
+
+
+class FaceMatcher:
+    """
+    Nearest-neighbour matcher over the known face encodings.
+
+    Known encodings are kept as one contiguous float32 (N, 128) matrix, sorted
+    by person id so that every person owns a contiguous block of rows. All
+    distances for a batch of query faces are computed with a single matrix
+    product, and the margin to the second-best person tells how confident
+    the match is.
+    """
+
+    def __init__(self, encodings=None, ids=None, tolerance=0.5):
+        """
+        Args:
+            encodings: Sequence of 128-d face encodings
+            ids: Person id for each encoding
+            tolerance: Maximum distance accepted as a match
+        """
+        self.tolerance = tolerance
+        self.set_encodings(encodings if encodings is not None else [], ids if ids is not None else [])
+
+    def set_encodings(self, encodings, ids):
+        """Replace the known encodings"""
+        if len(encodings) != len(ids):
+            raise ValueError(f"Got {len(encodings)} encodings but {len(ids)} ids")
+
+        if len(encodings) == 0:
+            self.encodings = np.empty((0, 128), dtype=np.float32)
+            self.ids = np.empty(0, dtype=object)
+            self.squared_norms = np.empty(0, dtype=np.float32)
+            self.person_ids = self.ids
+            self.person_starts = np.empty(0, dtype=np.intp)
+            return
+
+        ids = np.asarray(ids)
+        order = np.argsort(ids, kind='stable')
+        self.ids = ids[order]
+        self.encodings = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32)[order])
+        self.squared_norms = np.einsum('ij,ij->i', self.encodings, self.encodings)
+
+        # First row of every person's block, used to reduce distances per person
+        boundaries = np.flatnonzero(self.ids[1:] != self.ids[:-1]) + 1
+        self.person_starts = np.concatenate(([0], boundaries)).astype(np.intp)
+        self.person_ids = self.ids[self.person_starts]
+
+    def __len__(self):
+        return len(self.encodings)
+
+    def distances(self, face_encodings):
+        """
+        Euclidean distances between query faces and every known encoding.
+
+        Args:
+            face_encodings: Array-like of shape (M, 128)
+
+        Returns:
+            float32 array of shape (M, N)
+        """
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+        query_norms = np.einsum('ij,ij->i', queries, queries)
+        # |q - k|^2 = |q|^2 + |k|^2 - 2 q.k, with the cross term in one BLAS call
+        squared = query_norms[:, None] + self.squared_norms[None, :] - 2.0 * (queries @ self.encodings.T)
+        np.maximum(squared, 0.0, out=squared)
+        return np.sqrt(squared, out=squared)
+
+    def match_batch(self, face_encodings):
+        """
+        Match several faces at once.
+
+        Args:
+            face_encodings: Array-like of shape (M, 128)
+
+        Returns:
+            List of M MatchResult tuples
+        """
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+        if len(queries) == 0:
+            return []
+        if len(self.encodings) == 0:
+            return [MatchResult(None, float('inf'), float('inf')) for _ in range(len(queries))]
+
+        # Best distance per person, shape (M, P)
+        person_distances = np.minimum.reduceat(self.distances(queries), self.person_starts, axis=1)
+
+        results = []
+        for row in person_distances:
+            if len(row) > 1:
+                best, second = np.argpartition(row, 1)[:2]
+                margin = float(row[second] - row[best])
+            else:
+                best = 0
+                margin = float('inf')
+            distance = float(row[best])
+            person_id = self.person_ids[best].item() if distance <= self.tolerance else None
+            results.append(MatchResult(person_id, distance, margin))
+        return results
+
+    def match(self, face_encoding):
+        """
+        Match a single face.
+
+        Returns:
+            MatchResult with the best person id (or None), its distance and
+            the margin to the second-best person
+        """
+        return self.match_batch([face_encoding])[0]
+
+    def match_mean(self, face_encodings):
+        """
+        Match the average of several encodings of the same face.
+
+        Averaging samples from consecutive frames smooths out blur and pose
+        noise of any single frame.
+        """
+        mean_encoding = np.mean(np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128), axis=0)
+        return self.match(mean_encoding)
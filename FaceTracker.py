@@ -0,0 +1,120 @@
+import cv2
+
+
+def box_area(box):
+    top, right, bottom, left = box
+    return max(0, right - left) * max(0, bottom - top)
+
+
+def box_iou(box_a, box_b):
+    """Intersection over union of two (top, right, bottom, left) boxes"""
+    if box_a is None or box_b is None:
+        return 0.0
+    top = max(box_a[0], box_b[0])
+    right = min(box_a[1], box_b[1])
+    bottom = min(box_a[2], box_b[2])
+    left = max(box_a[3], box_b[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+    union = box_area(box_a) + box_area(box_b) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def create_tracker():
+    """Create the lightest OpenCV tracker available, or None"""
+    for name in ("TrackerKCF_create", "TrackerMOSSE_create"):
+        for module in (cv2, getattr(cv2, "legacy", None)):
+            if module is not None and hasattr(module, name):
+                return getattr(module, name)()
+    return None
+
+
+def tracker_frame(frame):
+    """KCF/MOSSE fail on single-channel frames after init, so give them 3 channels"""
+    if frame.ndim == 2:
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB)
+    return frame
+
+
+class FaceTracker:
+    """
+    Follows one face box between periodic detections.
+
+    The (slow) detector only runs every detect_every frames, or right away
+    when the tracker loses the face. In between, an OpenCV KCF/MOSSE tracker
+    moves the box. Grayscale frames are expanded to 3 channels for the
+    tracker. All boxes use the face_recognition (top, right, bottom, left)
+    format.
+    """
+
+    def __init__(self, detect_every=5):
+        """
+        Args:
+            detect_every: Run the detector at least once every N frames
+        """
+        self.detect_every = max(1, detect_every)
+        self.tracker = None
+        self.box = None
+        self.frames_since_detection = 0
+
+    def clear(self):
+        self.tracker = None
+        self.box = None
+        self.frames_since_detection = 0
+
+    def start(self, frame, box):
+        """Start tracking box in frame"""
+        self.clear()
+        tracker = create_tracker()
+        if tracker is None:
+            return
+        top, right, bottom, left = box
+        try:
+            tracker.init(tracker_frame(frame), (int(left), int(top), int(right - left), int(bottom - top)))
+        except cv2.error as e:
+            print(f"Could not start face tracker: {e}")
+            return
+        self.tracker = tracker
+        self.box = box
+
+    def update(self, frame):
+        """
+        Move the tracked box to the new frame.
+
+        Returns:
+            The new box, or None if the tracker lost the face
+        """
+        if self.tracker is None:
+            return None
+        try:
+            ok, (x, y, w, h) = self.tracker.update(tracker_frame(frame))
+        except cv2.error:
+            ok = False
+        if not ok or w <= 0 or h <= 0:
+            self.clear()
+            return None
+        self.box = (int(y), int(x + w), int(y + h), int(x))
+        self.frames_since_detection += 1
+        return self.box
+
+    def locate(self, frame, detect):
+        """
+        Find faces in frame, running detect(frame) only when needed.
+
+        Args:
+            frame: Analysis frame
+            detect: Callable returning a list of face boxes for a frame
+
+        Returns:
+            List of face boxes; the tracked face is the largest detected one
+        """
+        if self.tracker is not None and self.frames_since_detection < self.detect_every:
+            box = self.update(frame)
+            if box is not None:
+                return [box]
+
+        boxes = detect(frame)
+        if boxes:
+            self.start(frame, max(boxes, key=box_area))
+        else:
+            self.clear()
+        return boxes
@@ -0,0 +1,130 @@
+import cv2
+import numpy as np
+import pygame
+
+
+class FrameTransform:
+    """
+    Geometry shared by the display and analysis frames.
+
+    Both frames show the same centre crop of the camera frame, the part that
+    matches the screen aspect ratio, at different sizes. Boxes use the
+    face_recognition (top, right, bottom, left) format.
+    """
+
+    def __init__(self, frame_shape, display_size, analysis_width):
+        """
+        Args:
+            frame_shape: Shape of the camera frames
+            display_size: (width, height) of the screen
+            analysis_width: Width of the analysis frame; never larger than the crop
+        """
+        cam_height, cam_width = frame_shape[:2]
+        screen_aspect = display_size[0] / display_size[1]
+
+        if cam_width / cam_height > screen_aspect:
+            crop_width = int(cam_height * screen_aspect)
+            crop_height = cam_height
+        else:
+            crop_width = cam_width
+            crop_height = int(cam_width / screen_aspect)
+        self.crop_left = (cam_width - crop_width) // 2
+        self.crop_top = (cam_height - crop_height) // 2
+        self.crop_size = (crop_width, crop_height)
+        self.crop = (slice(self.crop_top, self.crop_top + crop_height),
+                     slice(self.crop_left, self.crop_left + crop_width))
+
+        analysis_width = min(analysis_width, crop_width)
+        self.display_size = tuple(display_size)
+        self.analysis_size = (analysis_width, max(1, round(analysis_width * crop_height / crop_width)))
+
+    @staticmethod
+    def _scale(box, scale_x, scale_y, offset_x=0, offset_y=0):
+        top, right, bottom, left = box
+        return (top * scale_y + offset_y, right * scale_x + offset_x,
+                bottom * scale_y + offset_y, left * scale_x + offset_x)
+
+    def analysis_to_camera(self, box):
+        return self._scale(box,
+                           self.crop_size[0] / self.analysis_size[0],
+                           self.crop_size[1] / self.analysis_size[1],
+                           self.crop_left, self.crop_top)
+
+    def camera_to_display(self, box):
+        top, right, bottom, left = box
+        return self._scale((top - self.crop_top, right - self.crop_left, bottom - self.crop_top, left - self.crop_left),
+                           self.display_size[0] / self.crop_size[0],
+                           self.display_size[1] / self.crop_size[1])
+
+    def analysis_to_display(self, box):
+        return self._scale(box,
+                           self.display_size[0] / self.analysis_size[0],
+                           self.display_size[1] / self.analysis_size[1])
+
+
+class FramePreprocessor:
+    """
+    Splits every camera frame into a display frame and an analysis frame.
+
+    Both are produced directly from the raw camera frame into preallocated
+    buffers: the display frame at screen size for pygame, the analysis frame
+    at a fixed width for detection, so detection cost does not depend on the
+    monitor. The pygame surface is created once with pygame.image.frombuffer
+    over the display RGB buffer, so no per-frame swapaxes/make_surface copy
+    is needed.
+    """
+
+    def __init__(self, screen_width, screen_height, analysis_width=320, grayscale=False):
+        """
+        Args:
+            screen_width: Display width
+            screen_height: Display height
+            analysis_width: Width of the frame passed to the detector
+            grayscale: Produce a single-channel analysis frame (HOG only)
+        """
+        self.display_size = (screen_width, screen_height)
+        self.analysis_width = analysis_width
+        self.grayscale = grayscale
+
+        self.display_bgr = np.empty((screen_height, screen_width, 3), dtype=np.uint8)
+        self.display_rgb = np.empty((screen_height, screen_width, 3), dtype=np.uint8)
+        self.surface = pygame.image.frombuffer(self.display_rgb, self.display_size, 'RGB')
+
+        self.frame_shape = None
+        self.transform = None
+        self.analysis_bgr = None
+        self.analysis = None
+
+    def _update_transform(self, frame_shape):
+        self.transform = FrameTransform(frame_shape, self.display_size, self.analysis_width)
+        width, height = self.transform.analysis_size
+        self.analysis_bgr = np.empty((height, width, 3), dtype=np.uint8)
+        self.analysis = np.empty((height, width) if self.grayscale else (height, width, 3), dtype=np.uint8)
+        self.frame_shape = frame_shape
+
+    def process(self, frame):
+        """
+        Produce the display and analysis frames for a BGR camera frame.
+
+        The returned arrays are reused by the next call; copy them to keep a frame.
+
+        Returns:
+            Tuple (display_bgr, display_rgb, analysis) where analysis is RGB,
+            or grayscale if enabled
+        """
+        if frame.shape != self.frame_shape:
+            self._update_transform(frame.shape)
+        cropped = frame[self.transform.crop]
+
+        cv2.resize(cropped, self.display_size, dst=self.display_bgr)
+        cv2.cvtColor(self.display_bgr, cv2.COLOR_BGR2RGB, dst=self.display_rgb)
+
+        cv2.resize(cropped, self.transform.analysis_size, dst=self.analysis_bgr, interpolation=cv2.INTER_AREA)
+        conversion = cv2.COLOR_BGR2GRAY if self.grayscale else cv2.COLOR_BGR2RGB
+        cv2.cvtColor(self.analysis_bgr, conversion, dst=self.analysis)
+
+        return self.display_bgr, self.display_rgb, self.analysis
+
+    def blit(self, screen, position=(0, 0)):
+        """Draw the last display frame"""
+        screen.blit(self.surface, position)
@@ -0,0 +1,90 @@
+import sqlite3
+import hashlib
+import threading
+
+DEFAULT_STRANGER_PASSWORD = "1965"
+DEFAULT_STRANGER_LANGUAGE = "EN"
+
+
+class GateDatabase:
+    """
+    Long-lived connections to people.db and events.db.
+
+    Connections are opened once at startup instead of once per lookup, and
+    every query uses a constant SQL string so sqlite3's per-connection
+    statement cache keeps it prepared between calls.
+
+    people.db is opened read-only: the kiosk never writes to it and
+    manageDB.py replaces the file in place when it uploads changes, so it
+    stays in rollback-journal mode to avoid a stale WAL being replayed on top
+    of the uploaded copy. events.db is only written by the kiosk and runs in
+    WAL mode with synchronous=NORMAL, so an insert no longer costs a full
+    fsync of the JPEG BLOB.
+    """
+
+    def __init__(self, people_db_path, events_db_path):
+        self.people_db_path = people_db_path
+        self.events_db_path = events_db_path
+        self.lock = threading.Lock()
+
+        self.people = sqlite3.connect(f"file:{people_db_path}?mode=ro", uri=True, check_same_thread=False)
+        self.people.execute("PRAGMA query_only = ON")
+        self.people.execute("PRAGMA temp_store = MEMORY")
+
+        self.events = sqlite3.connect(events_db_path, check_same_thread=False)
+        self.events.execute("PRAGMA journal_mode = WAL")
+        self.events.execute("PRAGMA synchronous = NORMAL")
+        self.events.execute('''CREATE TABLE IF NOT EXISTS events
+                               (date TEXT, time TEXT, picture BLOB, name TEXT, surname TEXT, action_code INTEGER)''')
+        self.events.commit()
+
+    def get_visitor_profile(self, person_id):
+        """
+        Get everything needed to greet a visitor and check their code.
+
+        Returns:
+            Tuple (name, surname, language, password_hash), or None if the
+            person does not exist
+        """
+        try:
+            with self.lock:
+                return self.people.execute(
+                    "SELECT name, surname, language, password_hash FROM persons WHERE id = ?",
+                    (person_id,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"An error occurred: {e}")
+            return None
+
+    def get_stranger_info(self):
+        """
+        Get the password hash and language used for unrecognized visitors.
+
+        Returns:
+            Tuple (password_hash, language), with defaults if no Stranger record exists
+        """
+        try:
+            with self.lock:
+                result = self.people.execute(
+                    "SELECT password_hash, language FROM persons WHERE name = ?",
+                    ("Stranger",)
+                ).fetchone()
+            if result:
+                return result
+        except sqlite3.Error as e:
+            print(f"An error occurred: {e}")
+        return hashlib.sha256(DEFAULT_STRANGER_PASSWORD.encode()).hexdigest(), DEFAULT_STRANGER_LANGUAGE
+
+    def log_event(self, date, time, picture, name, surname, action_code):
+        self.log_events([(date, time, picture, name, surname, action_code)])
+
+    def log_events(self, events):
+        """Insert several (date, time, picture, name, surname, action_code) rows in one transaction"""
+        with self.lock:
+            with self.events:
+                self.events.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)", events)
+
+    def close(self):
+        with self.lock:
+            self.people.close()
+            self.events.close()
@@ -0,0 +1,172 @@
+import pygame
+
+BACKGROUND_COLOR = (240, 240, 240)  # '#F0F0F0'
+MESSAGE_COLOR = (25, 118, 210)  # '#1976D2'
+USER_NAME_COLOR = (244, 67, 54)  # '#F44336'
+COUNTDOWN_BG_COLOR = (76, 175, 80)  # '#4CAF50' - green
+CODE_COLOR = (51, 51, 51)
+PRESSED_LIGHTEN = 60  # Added to each channel of a pressed button
+
+
+def countdown_color(remaining_time):
+    if remaining_time <= 3:
+        return (255, 0, 0)  # red
+    if remaining_time <= 5:
+        return (255, 165, 0)  # orange
+    return (255, 255, 255)  # white
+
+
+class KeypadScreen:
+    """
+    Retained-mode keypad screen used by show_keyboard.
+
+    The button grid is rendered once into two surfaces, normal and pressed,
+    and reused for every later visitor with the same language. A frame only
+    redraws the parts of the screen whose content changed (attempts message,
+    countdown, entered code, pressed button) and pushes just those rectangles
+    with pygame.display.update, instead of repainting and flipping the whole
+    screen 30 times a second.
+    """
+
+    def __init__(self, screen, render_text, buttons, button_colors):
+        """
+        Args:
+            screen: pygame display surface
+            render_text: Callable(text, size, color) returning a (cached) text surface
+            buttons: Rows of button labels
+            button_colors: Rows of button colors, same shape as buttons
+        """
+        self.screen = screen
+        self.render_text = render_text
+        self.buttons = buttons
+
+        screen_width, screen_height = screen.get_size()
+        self.screen_width = screen_width
+        self.button_width = screen_width // 3
+        self.button_height = screen_height // 6
+        self.header_height = screen_height // 6
+
+        # Fonts - match original sizes
+        self.message_font_size = int(screen_height / 30)
+        self.user_name_font_size = int(self.message_font_size * 1.6)
+        self.countdown_font_size = int((screen_height / 50) * 1.5)
+        self.button_font_size = int(screen_height / 16)
+
+        countdown_width = 80
+        box_height = self.header_height * 0.8
+        self.countdown_rect = pygame.Rect(
+            screen_width // 2 - countdown_width // 2, self.header_height * 0.1, countdown_width, box_height
+        )
+        code_bg_width = screen_width // 4
+        self.code_rect = pygame.Rect(
+            screen_width - code_bg_width - 20, self.header_height * 0.1, code_bg_width, box_height
+        )
+
+        grid_size = (screen_width, screen_height - self.header_height)
+        self.grid = pygame.Surface(grid_size).convert()
+        self.grid_pressed = pygame.Surface(grid_size).convert()
+        self.grid.fill(BACKGROUND_COLOR)
+        self.grid_pressed.fill(BACKGROUND_COLOR)
+        for row_idx, row in enumerate(buttons):
+            for col_idx, button_text in enumerate(row):
+                color = button_colors[row_idx][col_idx]
+                pressed_color = tuple(min(255, channel + PRESSED_LIGHTEN) for channel in color)
+                rect = self._button_rect(row_idx, col_idx).move(0, -self.header_height)
+                text_surface = render_text(button_text, self.button_font_size, (255, 255, 255))
+                for surface, fill in ((self.grid, color), (self.grid_pressed, pressed_color)):
+                    pygame.draw.rect(surface, fill, rect)
+                    surface.blit(text_surface, text_surface.get_rect(center=rect.center))
+
+        self.user_name_rect = None
+        self.message_rect = None
+        self.shown = {}
+
+    def _button_rect(self, row, col):
+        """Screen rectangle of a button, with small padding"""
+        x = col * self.button_width
+        y = self.header_height + row * self.button_height
+        return pygame.Rect(x + 2, y + 2, self.button_width - 4, self.button_height - 4)
+
+    def button_at(self, pos):
+        """Return (row, col) of the button under pos, or None"""
+        x, y = pos
+        if y <= self.header_height:
+            return None
+        row = (y - self.header_height) // self.button_height
+        col = x // self.button_width
+        if 0 <= row < len(self.buttons) and 0 <= col < len(self.buttons[row]):
+            return row, col
+        return None
+
+    def draw_all(self, user_name, message_text, remaining_time, code_length, pressed=None):
+        """Repaint the whole screen, e.g. after another screen drew over it"""
+        self.screen.fill(BACKGROUND_COLOR)
+        user_name_surface = self.render_text(user_name, self.user_name_font_size, USER_NAME_COLOR)
+        self.user_name_rect = user_name_surface.get_rect(
+            topleft=(20, self.header_height // 2 - self.user_name_font_size // 2)
+        )
+        self.screen.blit(user_name_surface, self.user_name_rect)
+        self.screen.blit(self.grid, (0, self.header_height))
+
+        self.message_rect = None
+        self.shown = {}
+        self.update(message_text, remaining_time, code_length, pressed, flip=False)
+        pygame.display.flip()
+
+    def update(self, message_text, remaining_time, code_length, pressed=None, flip=True):
+        """
+        Redraw only what changed since the last call.
+
+        Args:
+            message_text: Text after the user name (attempts left)
+            remaining_time: Countdown seconds
+            code_length: Number of digits entered
+            pressed: (row, col) of the button to show pressed, or None
+        """
+        dirty = []
+
+        if self.shown.get('message') != message_text:
+            if self.message_rect is not None:
+                self.screen.fill(BACKGROUND_COLOR, self.message_rect)
+                dirty.append(self.message_rect)
+            message_surface = self.render_text(message_text, self.message_font_size, MESSAGE_COLOR)
+            self.message_rect = message_surface.get_rect(
+                left=self.user_name_rect.right + 5, centery=self.user_name_rect.centery
+            )
+            self.screen.blit(message_surface, self.message_rect)
+            dirty.append(self.message_rect)
+            self.shown['message'] = message_text
+            # A long message can run under the boxes on its right
+            if self.message_rect.colliderect(self.countdown_rect):
+                self.shown.pop('countdown', None)
+            if self.message_rect.colliderect(self.code_rect):
+                self.shown.pop('code', None)
+
+        if self.shown.get('countdown') != remaining_time:
+            pygame.draw.rect(self.screen, COUNTDOWN_BG_COLOR, self.countdown_rect)
+            countdown_surface = self.render_text(str(remaining_time), self.countdown_font_size,
+                                                 countdown_color(remaining_time))
+            self.screen.blit(countdown_surface, countdown_surface.get_rect(center=self.countdown_rect.center))
+            dirty.append(self.countdown_rect)
+            self.shown['countdown'] = remaining_time
+
+        if self.shown.get('code') != code_length:
+            pygame.draw.rect(self.screen, (255, 255, 255), self.code_rect)
+            pygame.draw.rect(self.screen, (200, 200, 200), self.code_rect, 2)  # Border
+            if code_length:
+                code_surface = self.render_text('*' * code_length, self.button_font_size, CODE_COLOR)
+                self.screen.blit(code_surface, code_surface.get_rect(center=self.code_rect.center))
+            dirty.append(self.code_rect)
+            self.shown['code'] = code_length
+
+        previous_pressed = self.shown.get('pressed')
+        if previous_pressed != pressed:
+            for button, grid in ((previous_pressed, self.grid), (pressed, self.grid_pressed)):
+                if button is not None:
+                    rect = self._button_rect(*button)
+                    self.screen.blit(grid, rect, rect.move(0, -self.header_height))
+                    dirty.append(rect)
+            self.shown['pressed'] = pressed
+
+        if flip and dirty:
+            pygame.display.update(dirty)
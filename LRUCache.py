@@ -0,0 +1,32 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Small least-recently-used cache.
+
+    Used for rendered text surfaces and text layout results, which are
+    requested again and again with the same arguments while a screen is shown.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self.entries:
+            return default
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,60 @@
+import time
+import cv2
+
+
+class MotionGate:
+    """
+    Cheap scene-change detector placed in front of the face detector.
+
+    Each analysis frame is converted to a blurred grayscale image and compared
+    with a running-average background. The detector only needs to run while
+    enough pixels change, plus a short hold time so a visitor who stands
+    still in front of the camera is not lost.
+    """
+
+    def __init__(self, pixel_threshold=25, min_changed_fraction=0.002, hold_time=2.0, learning_rate=0.05):
+        """
+        Args:
+            pixel_threshold: Gray level difference that counts a pixel as changed
+            min_changed_fraction: Fraction of changed pixels that counts as motion
+            hold_time: Seconds the gate stays open after the last motion
+            learning_rate: How fast the background adapts to lighting changes
+        """
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.hold_time = hold_time
+        self.learning_rate = learning_rate
+        self.background = None
+        self.last_motion_time = 0.0
+
+    def reset(self):
+        """Forget the background; the next frame opens the gate"""
+        self.background = None
+
+    def update(self, rgb_frame):
+        """
+        Feed the next analysis frame.
+
+        Args:
+            rgb_frame: Small RGB or grayscale frame used for detection
+
+        Returns:
+            True if the scene changed recently and detection should run
+        """
+        gray = rgb_frame if rgb_frame.ndim == 2 else cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+        now = time.monotonic()
+
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray.astype("float32")
+            self.last_motion_time = now
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        changed_fraction = cv2.countNonZero(mask) / mask.size
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+        if changed_fraction >= self.min_changed_fraction:
+            self.last_motion_time = now
+        return now - self.last_motion_time <= self.hold_time
@@ -0,0 +1,133 @@
+import sqlite3
+import threading
+import time
+
+
+class NotificationQueue:
+    """
+    Outbound notification queue with an on-disk spool.
+
+    Notifications are stored in a small SQLite table before anything is sent,
+    and a single sender thread delivers them in order. When a send fails the
+    sender backs off exponentially and keeps the rest of the spool waiting;
+    once a send succeeds again everything that piled up is delivered in one
+    go. Notifications survive restarts and network outages.
+    """
+
+    def __init__(self, spool_path, send, initial_backoff=2.0, max_backoff=300.0, max_attempts=50):
+        """
+        Args:
+            spool_path: SQLite file holding undelivered notifications
+            send: Callable(message, photo, user_lang) that raises on failure;
+                an exception with a true `permanent` attribute drops the
+                notification instead of retrying it
+            initial_backoff: Seconds to wait after the first failure
+            max_backoff: Upper limit of the wait between attempts
+            max_attempts: Attempts after which a notification is dropped
+        """
+        self.send = send
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.backoff = initial_backoff
+
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.retry = threading.Event()
+        self.running = True
+
+        self.conn = sqlite3.connect(spool_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS outbox
+                             (id INTEGER PRIMARY KEY, created REAL, message TEXT, photo BLOB,
+                              user_lang TEXT, attempts INTEGER DEFAULT 0)''')
+        self.conn.commit()
+
+        self.thread = threading.Thread(target=self._sender_loop, daemon=True)
+        self.thread.start()
+
+    def enqueue(self, message, photo=None, user_lang="EN"):
+        """Spool a notification and return immediately"""
+        with self.lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO outbox (created, message, photo, user_lang) VALUES (?, ?, ?, ?)",
+                    (time.time(), message, photo, user_lang)
+                )
+        self.wakeup.set()
+
+    def retry_now(self):
+        """Cut the current backoff short, e.g. when the connection comes back"""
+        self.retry.set()
+        self.wakeup.set()
+
+    def pending(self):
+        """Number of notifications not delivered yet"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def _next(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT id, message, photo, user_lang, attempts FROM outbox ORDER BY id LIMIT 1"
+            ).fetchone()
+
+    def _sender_loop(self):
+        while self.running:
+            row = self._next()
+            if row is None:
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+
+            notification_id, message, photo, user_lang, attempts = row
+            try:
+                self.send(message, photo, user_lang)
+            except Exception as e:
+                if getattr(e, "permanent", False):
+                    # Retrying cannot help and would hold back every notification behind it
+                    print(f"Dropping notification {notification_id}, rejected: {e}")
+                    with self.lock:
+                        with self.conn:
+                            self.conn.execute("DELETE FROM outbox WHERE id = ?", (notification_id,))
+                    continue
+                attempts += 1
+                with self.lock:
+                    with self.conn:
+                        if attempts >= self.max_attempts:
+                            print(f"Dropping notification {notification_id} after {attempts} attempts: {e}")
+                            self.conn.execute("DELETE FROM outbox WHERE id = ?", (notification_id,))
+                        else:
+                            self.conn.execute("UPDATE outbox SET attempts = ? WHERE id = ?", (attempts, notification_id))
+                print(f"Notification not sent ({e}), retrying in {self.backoff:.0f}s")
+                # A new notification does not cut the backoff short; retry_now() and stop() do
+                if self._sleep(self.backoff):
+                    break
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+                continue
+
+            self.backoff = self.initial_backoff
+            with self.lock:
+                with self.conn:
+                    self.conn.execute("DELETE FROM outbox WHERE id = ?", (notification_id,))
+
+    def _sleep(self, seconds):
+        """Sleep unless stopped or retried; returns True if stop() was called"""
+        self.retry.clear()
+        deadline = time.monotonic() + seconds
+        while self.running and not self.retry.is_set() and time.monotonic() < deadline:
+            self.retry.wait(min(0.5, deadline - time.monotonic()))
+        return not self.running
+
+    def stop(self, timeout=5):
+        """Stop the sender; undelivered notifications stay in the spool for the next start"""
+        self.running = False
+        self.retry.set()
+        self.wakeup.set()
+        self.thread.join(timeout=timeout)
+        if self.thread.is_alive():
+            print("Notification sender is still busy, leaving the spool open")
+            return
+        with self.lock:
+            self.conn.close()
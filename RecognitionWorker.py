@@ -0,0 +1,146 @@
+import multiprocessing
+import queue
+
+
+def _worker_main(requests, results, detector_name, detector_options):
+    """Worker process: run detection and encoding for each request"""
+    import face_recognition
+    from FaceDetectors import create_detector
+
+    detector = create_detector(detector_name, **detector_options)
+
+    while True:
+        request = requests.get()
+        # Skip requests that were superseded while the previous one was running
+        while request is not None:
+            try:
+                request = requests.get_nowait()
+            except queue.Empty:
+                break
+        if request is None:
+            break
+        request_id, image = request
+        try:
+            locations = detector.detect(image)
+            encodings = face_recognition.face_encodings(image, locations) if locations else []
+            results.put((request_id, locations, encodings, None))
+        except Exception as e:
+            results.put((request_id, [], [], str(e)))
+
+
+class RecognitionWorker:
+    """
+    Runs the slow recognition stage (detector plus encoding) in a separate process.
+
+    The pygame loop submits a frame and keeps rendering; it polls for the
+    result on every frame. The worker always skips to the newest request,
+    and results for cancelled or superseded requests are dropped.
+
+    The process is started with forkserver (spawn where unavailable), never
+    a plain fork: it is started after pygame and restarted while the camera
+    and I/O threads run.
+
+    If the process dies (dlib crash, out of memory) it is restarted; after
+    max_restarts restarts a RuntimeError is raised so the kiosk exits and
+    the watchdog restarts it.
+    """
+
+    def __init__(self, detector_name="cnn", max_restarts=3, **detector_options):
+        """
+        Args:
+            detector_name: Detector used in the worker (see FaceDetectors.create_detector)
+            max_restarts: Restarts allowed after the worker process died
+            detector_options: Extra arguments for create_detector
+        """
+        self.detector_name = detector_name
+        self.detector_options = detector_options
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.context = multiprocessing.get_context(method)
+        self.requests = None
+        self.results = None
+        self.process = None
+        self.next_request_id = 0
+        self.pending_request_id = None
+
+    def start(self):
+        """Start the worker process"""
+        # Fresh queues, a dead worker may have left the old ones locked
+        self.requests = self.context.Queue()
+        self.results = self.context.Queue()
+        self.process = self.context.Process(
+            target=_worker_main,
+            args=(self.requests, self.results, self.detector_name, self.detector_options),
+            daemon=True
+        )
+        self.process.start()
+        return self
+
+    def ensure_alive(self):
+        """
+        Restart the worker process if it died.
+
+        Returns:
+            True if it had to be restarted (pending requests are lost)
+        """
+        if self.process is None or self.process.is_alive():
+            return False
+        print(f"Recognition worker died (exit code {self.process.exitcode})")
+        if self.restarts >= self.max_restarts:
+            raise RuntimeError(f"Recognition worker died {self.restarts + 1} times")
+        self.restarts += 1
+        self.pending_request_id = None
+        self.start()
+        return True
+
+    def submit(self, image):
+        """
+        Queue an image for detection and encoding, superseding any request not yet started.
+
+        Returns:
+            Request id to pass to poll()
+        """
+        self.ensure_alive()
+        self.next_request_id += 1
+        self.pending_request_id = self.next_request_id
+        self.requests.put((self.pending_request_id, image))
+        return self.pending_request_id
+
+    def cancel(self):
+        """Forget the pending request; its result will be discarded"""
+        self.pending_request_id = None
+
+    def poll(self, request_id):
+        """
+        Check for the result of a request without blocking.
+
+        Returns:
+            Tuple (face_locations, face_encodings), or None if not ready yet;
+            ([], []) if the worker died and the request was lost
+        """
+        while True:
+            try:
+                result_id, locations, encodings, error = self.results.get_nowait()
+            except queue.Empty:
+                if self.ensure_alive():
+                    return [], []
+                return None
+            if result_id != request_id:
+                continue
+            self.pending_request_id = None
+            if error:
+                print(f"Error in recognition worker: {error}")
+                return [], []
+            return locations, encodings
+
+    def stop(self):
+        """Stop the worker process"""
+        if self.process is None:
+            return
+        self.cancel()
+        self.requests.put(None)
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
@@ -0,0 +1,58 @@
+import heapq
+import itertools
+import time
+
+
+class ScheduledTask:
+    __slots__ = ('due', 'callback', 'args', 'cancelled')
+
+    def __init__(self, due, callback, args):
+        self.due = due
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    """
+    Timed tasks for the single pygame loop.
+
+    Animation steps, timeouts and delayed actions are queued here instead of
+    blocking with pygame.time.wait. Tasks run on the pygame thread whenever
+    the loop calls run_due(), so they may draw to the screen.
+    """
+
+    def __init__(self):
+        self.tasks = []  # heap of (due, sequence, task)
+        self.sequence = itertools.count()
+
+    def call_later(self, delay, callback, *args):
+        """
+        Run callback(*args) after delay seconds.
+
+        Returns:
+            ScheduledTask that can be cancelled
+        """
+        task = ScheduledTask(time.monotonic() + delay, callback, args)
+        heapq.heappush(self.tasks, (task.due, next(self.sequence), task))
+        return task
+
+    def next_due(self):
+        """Monotonic time of the next pending task, or None"""
+        while self.tasks and self.tasks[0][2].cancelled:
+            heapq.heappop(self.tasks)
+        return self.tasks[0][0] if self.tasks else None
+
+    def run_due(self):
+        """Run every task whose time has come, in order"""
+        now = time.monotonic()
+        while self.tasks and self.tasks[0][0] <= now:
+            _, _, task = heapq.heappop(self.tasks)
+            if not task.cancelled:
+                task.callback(*task.args)
+
+    def clear(self):
+        self.tasks = []
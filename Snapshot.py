@@ -0,0 +1,47 @@
+import cv2
+
+
+class Snapshot:
+    """
+    JPEG snapshot of a visitor, encoded once in memory.
+
+    The same bytes are sent to Telegram and stored in events.db, so there is
+    no face.jpg on disk that a second visitor could overwrite while an
+    upload is still running.
+    """
+
+    def __init__(self, jpeg):
+        """
+        Args:
+            jpeg: Encoded JPEG bytes
+        """
+        self.jpeg = jpeg
+
+    @classmethod
+    def from_frame(cls, frame, box=None, margin=0.6, quality=85):
+        """
+        Crop the face region plus a margin from a BGR frame and encode it as JPEG.
+
+        Args:
+            frame: BGR numpy frame, ideally the full-resolution camera frame
+            box: (top, right, bottom, left) face box in frame coordinates;
+                the whole frame is used if None
+            margin: Extra space around the face as a fraction of the face size
+            quality: JPEG quality (0-100)
+        """
+        if box is not None:
+            top, right, bottom, left = box
+            margin_x = int((right - left) * margin)
+            margin_y = int((bottom - top) * margin)
+            height, width = frame.shape[:2]
+            top = max(0, int(top) - margin_y)
+            bottom = min(height, int(bottom) + margin_y)
+            left = max(0, int(left) - margin_x)
+            right = min(width, int(right) + margin_x)
+            if bottom > top and right > left:
+                frame = frame[top:bottom, left:right]
+
+        ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+        if not ok:
+            raise ValueError("Could not encode snapshot as JPEG")
+        return cls(encoded.tobytes())
@@ -0,0 +1,48 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """
+    Per-phase timing of the kiosk startup.
+
+    Phases are recorded from the main thread and from the warm-up thread;
+    report() prints them, marking the ones that ran in the background, so a
+    restart-to-ready time can be compared between versions.
+    """
+
+    def __init__(self, enabled=False, started_at=None):
+        """
+        Args:
+            enabled: Print the report (phases are always recorded, it is cheap)
+            started_at: time.perf_counter() value at process start
+        """
+        self.enabled = enabled
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.phases = []  # (name, seconds, background)
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds):
+        background = threading.current_thread() is not threading.main_thread()
+        with self.lock:
+            self.phases.append((name, seconds, background))
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as one phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def report(self):
+        if not self.enabled:
+            return
+        print("Startup profile:")
+        with self.lock:
+            for name, seconds, background in self.phases:
+                suffix = "  (background)" if background else ""
+                print(f"  {name:<20} {seconds:7.3f} s{suffix}")
+        print(f"  {'ready after':<20} {time.perf_counter() - self.started_at:7.3f} s")
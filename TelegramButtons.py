@@ -3,7 +3,8 @@ import time
 import json
 import configparser
 import os
-import pandas as pd
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 
 from translations import get_translations_cached as load_translations, get_message
 
@@ -18,24 +19,44 @@ def load_config():
 
 TOKEN, chat_id, N_to_buttons = load_config()
 
-def send_message_with_buttons(message, image_path, buttons, translations):
-    if image_path and os.path.exists(image_path):
+LONG_POLL_TIMEOUT = 25  # Seconds Telegram holds a getUpdates request open
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) timeout for regular API calls
+OFFSET_FILE = "telegram_offset.txt"
+
+# One keep-alive HTTPS session for all Telegram API calls
+_session = requests.Session()
+
+
+class TelegramApiError(Exception):
+    """Telegram answered with ok=false"""
+
+    def __init__(self, error_code, description):
+        super().__init__(f"Telegram error {error_code}: {description}")
+        self.error_code = error_code
+        # Bad requests (wrong chat_id, caption too long, ...) fail the same way on every retry;
+        # rate limits and server errors do not
+        self.permanent = error_code is not None and 400 <= error_code < 500 and error_code != 429
+
+def send_message_with_buttons(message, photo, buttons, translations):
+    """
+    Send a message, with the JPEG bytes in photo attached if given.
+    """
+    if photo:
         url = f"https://api.telegram.org/bot{TOKEN}/sendPhoto"
-        with open(image_path, "rb") as image_file:
-            files = {"photo": image_file}
-            data = {
-                "chat_id": chat_id,
-                "caption": message,
+        files = {"photo": ("face.jpg", photo, "image/jpeg")}
+        data = {
+            "chat_id": chat_id,
+            "caption": message,
+        }
+        if buttons:
+            keyboard = {
+                "inline_keyboard": [
+                    [{"text": get_message(7, translations), "callback_data": "open_gate"}],  # Opening gate...
+                    [{"text": get_message(23, translations), "callback_data": "cancel"}]  # Cancel
+                ]
             }
-            if buttons:
-                keyboard = {
-                    "inline_keyboard": [
-                        [{"text": get_message(7, translations), "callback_data": "open_gate"}],  # Opening gate...
-                        [{"text": get_message(23, translations), "callback_data": "cancel"}]  # Cancel
-                    ]
-                }
-                data["reply_markup"] = json.dumps(keyboard)
-            response = requests.post(url, data=data, files=files)
+            data["reply_markup"] = json.dumps(keyboard)
+        response = _session.post(url, data=data, files=files, timeout=REQUEST_TIMEOUT)
     else:
         url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
         data = {
@@ -50,62 +71,187 @@ def send_message_with_buttons(message, image_path, buttons, translations):
                 ]
             }
             data["reply_markup"] = json.dumps(keyboard)
-        response = requests.post(url, data=data)
+        response = _session.post(url, data=data, timeout=REQUEST_TIMEOUT)
     
-    return response.json()['result']['message_id']
+    try:
+        body = response.json()
+    except ValueError:
+        body = {"ok": False, "error_code": response.status_code, "description": response.text}
+    if not body.get("ok"):
+        raise TelegramApiError(body.get("error_code"), body.get("description"))
+    return body['result']['message_id']
 
-def get_updates(offset, timeout=1):
+def get_updates(offset, timeout=LONG_POLL_TIMEOUT):
+    """Long-poll getUpdates; Telegram answers as soon as an update arrives"""
     url = f"https://api.telegram.org/bot{TOKEN}/getUpdates"
-    params = {"offset": offset, "timeout": timeout}
-    response = requests.get(url, params=params)
+    params = {"offset": offset, "timeout": timeout, "allowed_updates": json.dumps(["callback_query"])}
+    response = _session.get(url, params=params, timeout=(REQUEST_TIMEOUT[0], timeout + 10))
     return response.json()
 
-def get_latest_update_id():
-    updates = get_updates(0)
-    if not updates.get("result"):
-        return 0
-    return max(update["update_id"] for update in updates["result"])
-
 def answer_callback_query(callback_query_id):
     url = f"https://api.telegram.org/bot{TOKEN}/answerCallbackQuery"
     data = {"callback_query_id": callback_query_id}
-    requests.post(url, data=data)
+    _session.post(url, data=data, timeout=REQUEST_TIMEOUT)
+
+
+class TelegramUpdateWorker:
+    """
+    Background long-poll loop for button presses.
 
-def telegram_button_handler(message, path, buttons, user_lang):
+    One thread keeps a getUpdates request open on the shared session and
+    resolves the Future registered for the message whose button was pressed.
+    The update offset is saved to OFFSET_FILE, so old button presses are not
+    replayed after a restart.
+    """
+
+    def __init__(self, offset_file=OFFSET_FILE):
+        self.offset_file = offset_file
+        self.offset = self._load_offset()
+        self.lock = threading.Lock()
+        self.waiting = {}  # message_id -> Future resolved with the callback data
+        self.unclaimed = {}  # Answers that arrived before expect() was called
+        self.thread = None
+
+    def _load_offset(self):
+        try:
+            with open(self.offset_file) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _save_offset(self):
+        tmp_path = self.offset_file + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(str(self.offset))
+            os.replace(tmp_path, self.offset_file)
+        except OSError as e:
+            print(f"Could not save Telegram offset: {e}")
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._poll_loop, daemon=True)
+            self.thread.start()
+        return self
+
+    def expect(self, message_id):
+        """Return a Future resolved with the callback data of a button pressed on message_id"""
+        future = Future()
+        with self.lock:
+            if message_id in self.unclaimed:
+                future.set_result(self.unclaimed.pop(message_id))
+            else:
+                self.waiting[message_id] = future
+        return future
+
+    def forget(self, message_id):
+        with self.lock:
+            self.waiting.pop(message_id, None)
+
+    def _poll_loop(self):
+        if self.offset is None:
+            # First run: skip whatever was pressed before the kiosk started
+            try:
+                updates = get_updates(-1, timeout=0).get("result", [])
+                self.offset = updates[-1]["update_id"] + 1 if updates else 0
+                self._save_offset()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Telegram getUpdates failed: {e}")
+                self.offset = 0
+
+        retry_delay = 1
+        last_error = None
+        while True:
+            try:
+                updates = get_updates(self.offset)
+                error = None if updates.get("ok") else updates.get("description", "not ok")
+            except (requests.exceptions.RequestException, ValueError) as e:
+                error = str(e)
+            
+            # Errors come back at once (bad token, another getUpdates consumer):
+            # back off instead of re-polling, and log each new error once
+            if error is not None:
+                if error != last_error:
+                    print(f"Telegram getUpdates failed: {error}")
+                    last_error = error
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 60)
+                continue
+            retry_delay = 1
+            last_error = None
+
+            results = updates.get("result", [])
+            for update in results:
+                self.offset = update["update_id"] + 1
+                if "callback_query" in update:
+                    self._dispatch(update["callback_query"])
+            if results:
+                self._save_offset()
+
+    def _dispatch(self, callback_query):
+        message_id = callback_query.get("message", {}).get("message_id")
+        with self.lock:
+            future = self.waiting.pop(message_id, None)
+            if future is None:
+                self.unclaimed[message_id] = callback_query["data"]
+                while len(self.unclaimed) > 16:
+                    del self.unclaimed[next(iter(self.unclaimed))]
+        try:
+            answer_callback_query(callback_query["id"])
+        except requests.exceptions.RequestException as e:
+            print(f"Could not answer Telegram callback: {e}")
+        if future is not None and not future.done():
+            future.set_result(callback_query["data"])
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def get_update_worker():
+    """The shared update worker, started on first use"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = TelegramUpdateWorker().start()
+        return _worker
+
+def telegram_button_handler(message, photo, buttons, user_lang):
     translations = load_translations('gate_project_translations.md', user_lang)
-    message_id = send_message_with_buttons(message, path, buttons, translations)
+    
+    if buttons:
+        # Start polling before sending, so a quick answer is not missed
+        worker = get_update_worker()
+    
+    message_id = send_message_with_buttons(message, photo, buttons, translations)
     
     if not buttons:
         return "0"  # No buttons, so we return immediately
     
-    offset = get_latest_update_id() + 1
-    start_time = time.time()
+    answer = worker.expect(message_id)
+    try:
+        callback_data = answer.result(timeout=N_to_buttons)
+    except FutureTimeoutError:
+        worker.forget(message_id)
+        return "0"  # Timeout occurred
     
-    while True:
-        current_time = time.time()
-        if current_time - start_time > N_to_buttons:
-            return "0"  # Timeout occurred
-        
-        updates = get_updates(offset, timeout=1)
-        
-        for update in updates.get("result", []):
-            offset = update["update_id"] + 1
-            if "callback_query" in update:
-                callback_query = update["callback_query"]
-                
-                if callback_query["message"]["message_id"] == message_id:
-                    callback_data = callback_query["data"]
-                    answer_callback_query(callback_query["id"])
-                    
-                    if callback_data == "open_gate":
-                        return "+1"
-                    elif callback_data == "cancel":
-                        return "-1"
+    return button_result(callback_data)
+
+def button_result(callback_data):
+    """Map a button's callback data to "+1" (open), "-1" (cancel) or "0" (anything else)"""
+    if callback_data == "open_gate":
+        return "+1"
+    elif callback_data == "cancel":
+        return "-1"
+    return "0"
 
 if __name__ == "__main__":
     user_lang = "EN"  # Default language for testing
     translations = load_translations('gate_project_translations.md', user_lang)
     test_message = get_message(1, translations)  # Welcome to Gate System
     test_path = "lev.jpg"
-    result = telegram_button_handler(test_message, test_path, buttons=False, user_lang=user_lang)
+    test_photo = None
+    if os.path.exists(test_path):
+        with open(test_path, "rb") as image_file:
+            test_photo = image_file.read()
+    result = telegram_button_handler(test_message, test_photo, buttons=False, user_lang=user_lang)
     print(f"TelegramButtons test result: {result}")
\ No newline at end of file
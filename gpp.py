@@ -12,29 +12,49 @@
 # - Optimized by further reducing the processing frame resolution.
 # ==============================================================================
 
+import time
+_process_started_at = time.perf_counter()
+
 import os
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 
+# face_recognition (dlib) and PIL are not imported here: they load in the
+# warm-up thread while the welcome screen is already shown. So do requests and
+# the Telegram/relay modules built on it. cv2 and numpy stay eager: the motion
+# gate, tracker, detector and frame preprocessor are created with the display.
+import argparse
 import pygame
 import cv2
-import face_recognition
 import numpy as np
-import time
-import sqlite3
 import hashlib
-import pickle
+import importlib
 from datetime import datetime
 import configparser
-import pandas as pd
-import socket
 import threading
-from PIL import Image
-import io
 import platform
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from translations import get_translations_cached as load_translations, get_message
-from TelegramButtons import telegram_button_handler
-from ControlSwitch import control_shelly_switch
+from CameraStream import CameraStream
+from FaceMatcher import FaceMatcher
+from EncodingCache import EncodingCache
+from FaceEncodings import encode_photo, load_precomputed_encodings
+from GateDatabase import GateDatabase
+from EventLogger import EventLogger
+from Snapshot import Snapshot
+from MotionGate import MotionGate
+from FaceTracker import FaceTracker, box_iou
+from RecognitionWorker import RecognitionWorker
+from FaceDetectors import create_detector
+from FramePipeline import FramePreprocessor
+from LRUCache import LRUCache
+from KeypadScreen import KeypadScreen
+from Scheduler import Scheduler
+from NotificationQueue import NotificationQueue
+from ConnectivityMonitor import ConnectivityMonitor
+from StartupProfiler import StartupProfiler
+
+IMPORT_TIME = time.perf_counter() - _process_started_at
 
 VERSION = "2.0.2"
 MODIFICATIONS = "Using mixed HOG->CNN model for performance and accuracy"
@@ -52,18 +72,38 @@ ip_gate = config['IP_adresses']['ip_gate'].strip('"')
 gate_delay = config['OpenGate']['gate_delay'].strip('"')
 gate_open_short = int(config['OpenGate']['gate_open_short'].strip('"'))
 gate_wait_short = int(config['OpenGate']['gate_wait_short'].strip('"'))
+encoding_workers = config.getint('FaceRecognition', 'encoding_workers', fallback=min(4, os.cpu_count() or 1))
+roi_crop_scale = config.getfloat('FaceRecognition', 'roi_crop_scale', fallback=2.0)
+roi_max_size = config.getint('FaceRecognition', 'roi_max_size', fallback=480)
+detector_name = config.get('FaceRecognition', 'detector', fallback='hog')
+scan_detector_name = config.get('FaceRecognition', 'scan_detector', fallback='cnn')
+analysis_width = config.getint('FaceRecognition', 'analysis_width', fallback=320)
+detector_options = {
+    'dnn_model': config.get('FaceRecognition', 'dnn_model', fallback=None),
+    'dnn_score_threshold': config.getfloat('FaceRecognition', 'dnn_score_threshold', fallback=0.8),
+}
+fusion_frames = config.getint('FaceRecognition', 'fusion_frames', fallback=3)
+early_exit_margin = config.getfloat('FaceRecognition', 'early_exit_margin', fallback=0.15)
+snapshot_quality = config.getint('Snapshot', 'jpeg_quality', fallback=85)
+snapshot_margin = config.getfloat('Snapshot', 'face_margin', fallback=0.6)
+motion_gate_enabled = config.getboolean('MotionGate', 'enabled', fallback=True)
+motion_idle_fps = config.getint('MotionGate', 'idle_fps', fallback=5)
+stability_iou = config.getfloat('FaceTracker', 'stability_iou', fallback=0.5)
 
-ENCODINGS_FILE = "known_face_encodings.pkl"
-IDS_FILE = "known_face_ids.pkl"
-DB_HASH_FILE = "db_hash.txt"
+ENCODING_CACHE_FILE = "face_encodings_cache.pkl"
+PEOPLE_DB = "people.db"
 EVENTS_DB = "events.db"
+NOTIFICATIONS_DB = "notifications.db"
 
 class UnifiedGateSystem:
-    def __init__(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
-        self.screen_width, self.screen_height = self.screen.get_size()
-        pygame.display.set_caption("Gate Project System")
+    def __init__(self, profiler=None):
+        self.profiler = profiler or StartupProfiler()
+        
+        with self.profiler.phase("display"):
+            pygame.init()
+            self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+            self.screen_width, self.screen_height = self.screen.get_size()
+            pygame.display.set_caption("Gate Project System")
         
         # Colors
         self.bg_color = (44, 62, 80)
@@ -72,19 +112,76 @@ class UnifiedGateSystem:
         # Fonts cache
         self.font_cache = {}
         
+        # Rendered text surfaces keyed by (text, size, color), and text layout results
+        self.text_cache = LRUCache(max_entries=256)
+        self.layout_cache = LRUCache(max_entries=256)
+        
+        # Keypad screens with their pre-rendered button grids, per language
+        self.keypad_screens = {}
+        
         # Face recognition data
         self.known_face_encodings = []
         self.known_face_ids = []
+        self.face_matcher = FaceMatcher(tolerance=0.5)
+        self.motion_gate = MotionGate(
+            pixel_threshold=config.getint('MotionGate', 'pixel_threshold', fallback=25),
+            min_changed_fraction=config.getfloat('MotionGate', 'min_changed_fraction', fallback=0.002),
+            hold_time=config.getfloat('MotionGate', 'hold_time', fallback=2.0)
+        )
+        self.face_tracker = FaceTracker(detect_every=config.getint('FaceTracker', 'detect_every', fallback=5))
+        
+        # Stage 1 detector runs in this process, the stage 2 detector in the worker.
+        # Its model is loaded by warm_up().
+        self.face_detector = create_detector(detector_name, **detector_options)
+        print(f"Face detectors: {detector_name} -> {scan_detector_name}")
         
-        # Camera
+        # Recognition stage worker, a separate process so the CNN never stalls the display
+        self.recognition_worker = RecognitionWorker(scan_detector_name, **detector_options).start()
+        
+        # Display and analysis frames, with a grayscale analysis frame when the detector allows it
+        self.frame_preprocessor = FramePreprocessor(
+            self.screen_width, self.screen_height, analysis_width,
+            grayscale=self.face_detector.accepts_grayscale
+        )
+        
+        # Camera, opened by warm_up()
         self.video_capture = None
-        self.init_camera()
+        self.camera_stream = None
+        self.startup_status = None
         
         # Clock for FPS control
         self.clock = pygame.time.Clock()
         
+        # Timed tasks run by pump(); blocking I/O (relays) runs on a single background
+        # thread so commands keep their order while the screen stays responsive
+        self.scheduler = Scheduler()
+        self.io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gate-io")
+        self.quit_requested = False
+        
         # Database connections
-        self.init_databases()
+        with self.profiler.phase("database"):
+            self.database = GateDatabase(PEOPLE_DB, EVENTS_DB)
+            self.event_logger = EventLogger(self.database)
+        
+        # Telegram notifications are spooled to disk and sent by one background thread
+        self.notifications = NotificationQueue(NOTIFICATIONS_DB, send_notification)
+        
+        # Cached reachability of Telegram and the relays; a returning connection flushes the spool
+        self.connectivity = ConnectivityMonitor(
+            [ip_arm, ip_night, ip_off, ip_gate],
+            probe_interval=config.getfloat('Connectivity', 'probe_interval', fallback=30.0),
+            probe_timeout=config.getfloat('Connectivity', 'probe_timeout', fallback=2.0)
+        )
+        self.connectivity.add_listener(self.on_connectivity_change)
+        self.connectivity.start()
+        
+        # Snapshot of the last recognized visitor
+        self.last_snapshot = None
+        
+    def on_connectivity_change(self, target, reachable):
+        """Send spooled notifications right away when Telegram becomes reachable again"""
+        if target == "telegram" and reachable:
+            self.notifications.retry_now()
         
     def init_camera(self):
         """Initialize camera with platform-specific settings"""
@@ -104,18 +201,11 @@ class UnifiedGateSystem:
         self.cam_width = int(self.video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.cam_height = int(self.video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
         print(f"Camera resolution: {self.cam_width}x{self.cam_height}")
+        
+        # Capture thread keeps the newest frames in a ring buffer
+        self.camera_stream = CameraStream(self.video_capture, self.cam_width, self.cam_height).start()
         return True
     
-    def init_databases(self):
-        """Initialize database connections"""
-        # Events database
-        conn = sqlite3.connect(EVENTS_DB)
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS events
-                     (date TEXT, time TEXT, picture BLOB, name TEXT, surname TEXT, action_code INTEGER)''')
-        conn.commit()
-        conn.close()
-    
     def get_font(self, size):
         """Get or create font with caching"""
         cache_key = f"universal_{size}"
@@ -143,6 +233,15 @@ class UnifiedGateSystem:
                     
         return self.font_cache[cache_key]
     
+    def render_text(self, text, size, color):
+        """Render text with the font of the given size, reusing earlier surfaces"""
+        key = (text, size, tuple(color))
+        surface = self.text_cache.get(key)
+        if surface is None:
+            surface = self.get_font(size).render(text, True, color)
+            self.text_cache.put(key, surface)
+        return surface
+    
     def show_message(self, message, duration=0):
         """Show fullscreen message"""
         self.screen.fill(self.bg_color)
@@ -153,7 +252,7 @@ class UnifiedGateSystem:
         y = self.screen_height // 2 - (len(lines) * font.get_linesize()) // 2
 
         for line in lines:
-            text_surface = font.render(line, True, self.text_color)
+            text_surface = self.render_text(line, font_size, self.text_color)
             text_rect = text_surface.get_rect(center=(self.screen_width // 2, y))
             self.screen.blit(text_surface, text_rect)
             y += font.get_linesize()
@@ -161,25 +260,87 @@ class UnifiedGateSystem:
         pygame.display.flip()
 
         if duration > 0:
-            pygame.time.wait(int(duration * 1000))
+            self.pump(duration)
+    
+    def pump(self, duration=0, until=None):
+        """
+        Keep the pygame loop running instead of blocking with pygame.time.wait.
+        
+        Scheduled tasks run on time and the event queue is pumped; other events
+        stay queued for the screen that is waiting for them. A QUIT event sets
+        quit_requested. Tasks due by the deadline have run when it returns.
+        
+        Args:
+            duration: Seconds to run, or the timeout when until is given
+            until: Optional callable; return as soon as it returns True
+        
+        Returns:
+            True if until() became true, False on timeout
+        """
+        deadline = time.monotonic() + duration
+        while True:
+            self.scheduler.run_due()
+            pygame.event.pump()
+            if pygame.event.get(pygame.QUIT):
+                self.quit_requested = True
+            
+            if until is not None and until():
+                return True
+            now = time.monotonic()
+            if now >= deadline:
+                # A task may have come due since run_due() above
+                self.scheduler.run_due()
+                return False
+            
+            # Sleep until the next task or the deadline, but keep pumping events
+            wake_up = min(deadline, self.scheduler.next_due() or deadline, now + 0.02)
+            pygame.time.wait(max(1, int((wake_up - now) * 1000)))
+    
+    def run_in_background(self, function, *args):
+        """Run blocking I/O (e.g. a relay command) off the pygame thread; returns a Future"""
+        return self.io_executor.submit(function, *args)
+    
+    def wait_for(self, future, timeout=30):
+        """Pump the loop until future is done and return its result (or raise its exception)"""
+        self.pump(timeout, until=future.done)
+        return future.result(timeout=0)
     
     def calculate_font_size(self, message):
         """Calculate optimal font size for message"""
+        key = ("font_size", message)
+        cached = self.layout_cache.get(key)
+        if cached is not None:
+            return cached
+        
         target_height = self.screen_height * 0.5
         max_font_size = self.screen_height // 4
         
-        for font_size in range(max_font_size, 10, -1):
+        def fits(font_size):
             font = self.get_font(font_size)
             lines = self.text_wrap(message, font, self.screen_width * 0.8)
-            total_height = font.get_linesize() * len(lines)
-            
-            if total_height <= target_height:
-                return font_size
+            return font.get_linesize() * len(lines) <= target_height
+        
+        # The text height grows with the font size, so binary search the largest size that fits
+        best_size = 10
+        low, high = 11, max_font_size
+        while low <= high:
+            middle = (low + high) // 2
+            if fits(middle):
+                best_size = middle
+                low = middle + 1
+            else:
+                high = middle - 1
         
-        return 10
+        self.layout_cache.put(key, best_size)
+        return best_size
     
     def text_wrap(self, text, font, max_width):
         """Wrap text to fit within max_width"""
+        key = ("wrap", text, font, max_width)
+        cached = self.layout_cache.get(key)
+        if cached is not None:
+            return cached
+        
         words = text.split()
         lines = []
         current_line = []
@@ -191,6 +352,9 @@ class UnifiedGateSystem:
                 lines.append(' '.join(current_line))
                 current_line = [word]
         lines.append(' '.join(current_line))
+        
+        lines = tuple(lines)
+        self.layout_cache.put(key, lines)
         return lines
     
     def pattern_metapixel(self):
@@ -200,9 +364,15 @@ class UnifiedGateSystem:
     def face_recognition_loop(self):
         """
         Face recognition loop with a two-phase (HOG -> CNN) approach for performance and reliability.
-        1. Fast 'hog' model runs on every frame to detect potential faces.
-        2. Once a face is stable for a moment, the accurate 'cnn' model is triggered
+        Both detectors can be swapped in gpp.ini (see FaceDetectors).
+        1. Fast 'hog' model runs in frames in which the scene changed
+           (see MotionGate) to detect potential faces. Between periodic HOG
+           detections the face box is followed by FaceTracker.
+        2. Once the tracked box is stable for a moment, the accurate 'cnn' model is triggered
            for a high-quality recognition to prevent misidentification of partial faces.
+           It runs in RecognitionWorker, so live video keeps rendering meanwhile.
+        3. Encodings from up to fusion_frames CNN samples are averaged; the
+           decision is made early as soon as the best match is clear enough.
         """
         help_text_it_line1 = "Posiziona il tuo viso"
         help_text_it_line2 = "davanti alla telecamera"
@@ -212,112 +382,149 @@ class UnifiedGateSystem:
         help_text_it_closer = "Avvicinati alla telecamera"
         help_text_en_closer = "Please come closer to the camera"
 
-        font = self.get_font(int(self.screen_height / 30))
-        name_font = self.get_font(int(self.screen_height / 20))
+        font_size = int(self.screen_height / 30)
+        name_font_size = int(self.screen_height / 20)
+        name_font = self.get_font(name_font_size)
+        
+        # The idle help overlay is rendered once and only blitted per frame
+        center_y = self.screen_height // 2; line_spacing = 35
+        help_overlay = []
+        for text, color, offset in ((help_text_it_line1, (255, 255, 255), -line_spacing * 2),
+                                    (help_text_it_line2, (255, 255, 255), -line_spacing),
+                                    (help_text_en_line1, (200, 200, 200), line_spacing),
+                                    (help_text_en_line2, (200, 200, 200), line_spacing * 2)):
+            text_surface = self.render_text(text, font_size, color)
+            help_overlay.append((text_surface, text_surface.get_rect(center=(self.screen_width // 2, center_y + offset))))
         
         recognition_candidate_time = None
+        candidate_box = None
         CONFIRMATION_DELAY = 0.7  # Delay in seconds for face stabilization
         
-        # Optimization: Reduce the frame resolution further to increase speed.
-        # Note: fx/fy is now 0.2, so coordinates must be scaled back up by a factor of 5.
-        RESIZE_FACTOR = 0.2
-        SCALE_UP_FACTOR = 1 / RESIZE_FACTOR
-
-        # Clear camera buffer
-        for _ in range(10):
-            if self.video_capture.isOpened():
-                self.video_capture.read()
+        # Pending CNN request, the camera and display frames it was made from and the
+        # (top, left, scale) of its crop
+        scan_request = None
+        scan_camera_frame = scan_rgb_frame = None
+        scan_roi = None
+        
+        # Encodings collected for the current visitor, the best frame to show and
+        # the camera frame and face box for the snapshot
+        scan_encodings = []
+        scan_attempts = 0
+        scan_box = best_rgb_frame = None
+        camera_box = best_camera_frame = None
+        scan_text_width = name_font.size("Scanning...")[0]
+        
+        # Drop frames captured before this session
+        self.camera_stream.flush()
+        self.motion_gate.reset()
+        self.face_tracker.clear()
         
         while True:
-            ret, frame = self.video_capture.read()
+            ret, camera_frame = self.camera_stream.read()
             if not ret:
                 continue
             
-            frame = self.scale_frame_to_screen(frame)
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # The display frames and the fixed-size analysis frame live in reused buffers,
+            # overwritten on the next iteration
+            frame, rgb_frame, small_frame = self.frame_preprocessor.process(camera_frame)
+            transform = self.frame_preprocessor.transform
             
-            # A smaller frame for analysis
-            small_frame = cv2.resize(rgb_frame, (0, 0), fx=RESIZE_FACTOR, fy=RESIZE_FACTOR)
+            # Skip detection while the scene is static and nobody is being tracked
+            scene_active = (not motion_gate_enabled or self.motion_gate.update(small_frame)
+                            or recognition_candidate_time is not None)
             
-            # STAGE 1: Fast detection with HOG on every frame
-            hog_face_locations = face_recognition.face_locations(small_frame, model='hog')
+            # STAGE 1: Fast detection with HOG every few frames, tracking in between
+            if scene_active:
+                hog_face_locations = self.face_tracker.locate(small_frame, self.face_detector.detect)
+            else:
+                self.face_tracker.clear()
+                hog_face_locations = []
             
-            frame_surface = pygame.surfarray.make_surface(rgb_frame.swapaxes(0, 1))
-            self.screen.blit(frame_surface, (0, 0))
+            self.frame_preprocessor.blit(self.screen)
 
             if not hog_face_locations:
                 # If no faces are found, reset the timer and show the help message
                 recognition_candidate_time = None
-                center_y = self.screen_height // 2; line_spacing = 35
-                text_surface = font.render(help_text_it_line1, True, (255, 255, 255)); text_rect = text_surface.get_rect(center=(self.screen_width // 2, center_y - line_spacing * 2)); self.screen.blit(text_surface, text_rect)
-                text_surface = font.render(help_text_it_line2, True, (255, 255, 255)); text_rect = text_surface.get_rect(center=(self.screen_width // 2, center_y - line_spacing)); self.screen.blit(text_surface, text_rect)
-                text_surface = font.render(help_text_en_line1, True, (200, 200, 200)); text_rect = text_surface.get_rect(center=(self.screen_width // 2, center_y + line_spacing)); self.screen.blit(text_surface, text_rect)
-                text_surface = font.render(help_text_en_line2, True, (200, 200, 200)); text_rect = text_surface.get_rect(center=(self.screen_width // 2, center_y + line_spacing * 2)); self.screen.blit(text_surface, text_rect)
+                candidate_box = None
+                if scan_request is not None:
+                    # The face left before the CNN finished
+                    self.recognition_worker.cancel()
+                    scan_request = None
+                scan_encodings = []
+                scan_attempts = 0
+                self.screen.blits(help_overlay, doreturn=False)
             else:
                 # Face found! Draw a yellow "pending" box
-                for (top, right, bottom, left) in hog_face_locations:
-                    top *= SCALE_UP_FACTOR; right *= SCALE_UP_FACTOR; bottom *= SCALE_UP_FACTOR; left *= SCALE_UP_FACTOR
+                for face_location in hog_face_locations:
+                    (top, right, bottom, left) = transform.analysis_to_display(face_location)
                     pygame.draw.rect(self.screen, (255, 255, 0), (left, top, right - left, bottom - top), 2)
 
-                # Check if this is the first time the face is detected
-                if recognition_candidate_time is None:
+                # Restart the timer when the face first appears or moves too much; samples
+                # collected so far may belong to someone else
+                current_box = self.face_tracker.box or hog_face_locations[0]
+                if recognition_candidate_time is None or box_iou(current_box, candidate_box) < stability_iou:
                     recognition_candidate_time = time.time()
+                    if scan_request is not None:
+                        self.recognition_worker.cancel()
+                        scan_request = None
+                    scan_encodings = []
+                    scan_attempts = 0
+                candidate_box = current_box
 
                 # If the face has been stable in the frame for long enough
-                if time.time() - recognition_candidate_time > CONFIRMATION_DELAY:
-                    # STAGE 2: Trigger the accurate but slow CNN recognition
-                    
-                    # Display a "Scanning..." message
-                    scan_text_surface = name_font.render("Scanning...", True, (0, 255, 0))
-                    scan_text_rect = scan_text_surface.get_rect(center=(self.screen_width // 2, 50))
+                if scan_request is None and time.time() - recognition_candidate_time > CONFIRMATION_DELAY:
+                    # STAGE 2: Hand the full-resolution face region to the accurate but slow CNN
+                    # in the background worker
+                    face_roi, scan_roi = self.crop_face_region(camera_frame, transform.analysis_to_camera(current_box))
+                    scan_request = self.recognition_worker.submit(face_roi)
+                    scan_camera_frame, scan_rgb_frame = camera_frame.copy(), rgb_frame.copy()
+                
+                if scan_request is not None:
+                    # Animated "Scanning..." message while the worker runs
+                    dots = "." * (int(time.time() * 3) % 4)
+                    scan_text_surface = self.render_text(f"Scanning{dots}", name_font_size, (0, 255, 0))
+                    scan_text_rect = scan_text_surface.get_rect(midleft=(self.screen_width // 2 - scan_text_width // 2, 50))
                     self.screen.blit(scan_text_surface, scan_text_rect)
-                    pygame.display.flip()
-
-                    # Use CNN for the final, precise location
-                    cnn_face_locations = face_recognition.face_locations(small_frame, model='cnn')
-                    
-                    if not cnn_face_locations:
-                        # If CNN finds no face (HOG was wrong), reset the timer
-                        recognition_candidate_time = None
-                        continue
-
-                    face_encodings = face_recognition.face_encodings(small_frame, cnn_face_locations)
-                    face_encoding = face_encodings[0] # Take the first face found
+            
+            scan_result = self.recognition_worker.poll(scan_request) if scan_request is not None else None
+            if scan_result is not None:
+                scan_request = None
+                scan_attempts += 1
+                cnn_face_locations, face_encodings = scan_result
+                
+                if cnn_face_locations:
+                    scan_encodings.append(face_encodings[0]) # Take the first face found
                     
-                    matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding, tolerance=0.5)
-                    recognized_id = "Stranger"
-                    if True in matches:
-                        face_distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
-                        best_match_index = np.argmin(face_distances)
-                        if matches[best_match_index]:
-                            recognized_id = str(self.known_face_ids[best_match_index])
+                    # Map the box from the crop back to camera, then screen coordinates
+                    (top, right, bottom, left) = cnn_face_locations[0]
+                    roi_top, roi_left, roi_scale = scan_roi
+                    camera_box = (roi_top + top / roi_scale, roi_left + right / roi_scale,
+                                  roi_top + bottom / roi_scale, roi_left + left / roi_scale)
+                    scan_box = transform.camera_to_display(camera_box)
+                    best_camera_frame, best_rgb_frame = scan_camera_frame, scan_rgb_frame
+                
+                if not scan_encodings:
+                    # If CNN finds no face (HOG was wrong), reset the timer
+                    recognition_candidate_time = None
+                    candidate_box = None
+                    scan_encodings = []
+                    scan_attempts = 0
+                    self.face_tracker.clear()
+                else:
+                    # Fuse all samples so far; stop early once the match is clear
+                    match = self.face_matcher.match_mean(scan_encodings)
+                    confident = match.person_id is not None and match.margin >= early_exit_margin
                     
-                    if recognized_id:
-                        (top, right, bottom, left) = cnn_face_locations[0]
-                        top *= SCALE_UP_FACTOR; right *= SCALE_UP_FACTOR; bottom *= SCALE_UP_FACTOR; left *= SCALE_UP_FACTOR
-                        pygame.draw.rect(self.screen, (0, 255, 0), (left, top, right - left, bottom - top), 2)
+                    if confident or scan_attempts >= fusion_frames:
+                        recognized_id = "Stranger"
+                        if match.person_id is not None:
+                            recognized_id = str(match.person_id)
+                        print(f"Recognized {recognized_id} from {len(scan_encodings)} frames: "
+                              f"distance {match.distance:.3f}, margin {match.margin:.3f}")
                         
-                        if recognized_id == "Stranger": text = "Hello, Stranger"
-                        else:
-                            conn = sqlite3.connect('people.db'); c = conn.cursor()
-                            c.execute("SELECT name FROM persons WHERE id = ?", (recognized_id,)); result = c.fetchone(); conn.close()
-                            if result: text = f"Hello, {result[0]}"
-                            else: text = f"Hello, ID: {recognized_id}"
-                        
-                        text_surface = name_font.render(text, True, (0, 255, 0))
-                        text_rect = text_surface.get_rect(center=(self.screen_width // 2, 50))
-                        self.screen.blit(text_surface, text_rect)
-                        pygame.display.flip()
-                        pygame.time.wait(1000)
-                        
-                        pygame.image.save(self.screen, "face.jpg")
-                        
-                        for _ in range(3):
-                            brightness = pygame.Surface((self.screen_width, self.screen_height)); brightness.set_alpha(64); brightness.fill((0, 0, 0)); self.screen.blit(brightness, (0, 0)); pygame.display.flip(); pygame.time.wait(200)
-                            self.screen.blit(frame_surface, (0, 0)); pygame.draw.rect(self.screen, (0, 255, 0), (left, top, right - left, bottom - top), 2); self.screen.blit(text_surface, text_rect); pygame.display.flip(); pygame.time.wait(200)
-                        
-                        for _ in range(5):
-                            if self.video_capture.isOpened(): self.video_capture.read()
+                        self.announce_recognition(best_rgb_frame, scan_box, best_camera_frame, camera_box,
+                                                  recognized_id, name_font)
+                        self.camera_stream.flush()
                         
                         return recognized_id
 
@@ -325,27 +532,85 @@ class UnifiedGateSystem:
             
             for event in pygame.event.get():
                 if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_q):
+                    if event.type == pygame.QUIT:
+                        self.quit_requested = True
                     return None
             
-            self.clock.tick(30)
+            self.clock.tick(30 if scene_active else motion_idle_fps)
     
-    def scale_frame_to_screen(self, frame):
-        """Scale camera frame to fit screen"""
-        cam_aspect = self.cam_width / self.cam_height
-        screen_aspect = self.screen_width / self.screen_height
-        
-        if cam_aspect > screen_aspect:
-            new_width = int(self.cam_height * screen_aspect)
-            crop_x = (self.cam_width - new_width) // 2
-            frame = frame[:, crop_x:crop_x + new_width]
-            frame = cv2.resize(frame, (self.screen_width, self.screen_height))
+    def announce_recognition(self, rgb_frame, face_box, camera_frame, camera_box, recognized_id, name_font):
+        """
+        Greet the recognized visitor on the scanned frame and take the snapshot.
+        
+        The greeting is drawn on the display frame; the snapshot is cropped from
+        the full-resolution camera frame the scan ran on.
+        """
+        frame_surface = pygame.image.frombuffer(rgb_frame, (self.screen_width, self.screen_height), 'RGB')
+        self.screen.blit(frame_surface, (0, 0))
+        
+        (top, right, bottom, left) = face_box
+        pygame.draw.rect(self.screen, (0, 255, 0), (left, top, right - left, bottom - top), 2)
+        
+        if recognized_id == "Stranger": text = "Hello, Stranger"
         else:
-            new_height = int(self.cam_width / screen_aspect)
-            crop_y = (self.cam_height - new_height) // 2
-            frame = frame[crop_y:crop_y + new_height, :]
-            frame = cv2.resize(frame, (self.screen_width, self.screen_height))
+            result = self.database.get_visitor_profile(recognized_id)
+            if result: text = f"Hello, {result[0]}"
+            else: text = f"Hello, ID: {recognized_id}"
+        
+        text_surface = name_font.render(text, True, (0, 255, 0))
+        text_rect = text_surface.get_rect(center=(self.screen_width // 2, 50))
+        self.screen.blit(text_surface, text_rect)
+        pygame.display.flip()
+        
+        # Encode the face crop once; Telegram and the event log share the bytes.
+        # Done while the greeting is on screen instead of after it.
+        self.last_snapshot = Snapshot.from_frame(camera_frame, camera_box, snapshot_margin, snapshot_quality)
+        
+        brightness = pygame.Surface((self.screen_width, self.screen_height)); brightness.set_alpha(64); brightness.fill((0, 0, 0))
         
-        return frame
+        def dim():
+            self.screen.blit(brightness, (0, 0)); pygame.display.flip()
+        
+        def restore():
+            self.screen.blit(frame_surface, (0, 0)); pygame.draw.rect(self.screen, (0, 255, 0), (left, top, right - left, bottom - top), 2); self.screen.blit(text_surface, text_rect); pygame.display.flip()
+        
+        # Show the greeting for a second, then blink three times
+        for blink in range(3):
+            self.scheduler.call_later(1.0 + blink * 0.4, dim)
+            self.scheduler.call_later(1.2 + blink * 0.4, restore)
+        self.pump(2.2)
+    
+    def crop_face_region(self, camera_frame, face_box):
+        """
+        Crop an expanded face region from the raw camera frame for the CNN stage.
+        
+        Args:
+            camera_frame: Full-resolution BGR camera frame
+            face_box: (top, right, bottom, left) of the face in camera_frame coordinates
+        
+        Returns:
+            Tuple (crop, (top, left, scale)) where scale is the resize factor
+            applied to the crop to keep it within roi_max_size
+        """
+        top, right, bottom, left = face_box
+        center_x, center_y = (left + right) / 2, (top + bottom) / 2
+        half_size = max(right - left, bottom - top) * roi_crop_scale / 2
+        
+        height, width = camera_frame.shape[:2]
+        crop_top = max(0, int(center_y - half_size))
+        crop_bottom = min(height, int(center_y + half_size))
+        crop_left = max(0, int(center_x - half_size))
+        crop_right = min(width, int(center_x + half_size))
+        crop = camera_frame[crop_top:crop_bottom, crop_left:crop_right]
+        
+        scale = 1.0
+        longest_side = max(crop.shape[:2])
+        if longest_side > roi_max_size:
+            scale = roi_max_size / longest_side
+            crop = cv2.resize(crop, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        
+        # The conversion also gives the worker its own copy of the ring buffer slot
+        return cv2.cvtColor(crop, cv2.COLOR_BGR2RGB), (crop_top, crop_left, scale)
     
     def show_keyboard(self, password_hash, max_attempts, user_lang, user_name):
         """Show keyboard using pygame"""
@@ -368,25 +633,35 @@ class UnifiedGateSystem:
             [get_message(33, translations), get_message(34, translations), get_message(32, translations)]  # Cancel, Ping, Enter
         ]
         
-        button_width = self.screen_width // 3
-        button_height = self.screen_height // 6
-        header_height = self.screen_height // 6
-        
-        # Fonts - match original sizes
-        message_font_size = int(self.screen_height / 30)
-        user_name_font_size = int(message_font_size * 1.6)
-        countdown_font_size = int((self.screen_height / 50) * 1.5)
+        # The keypad with its pre-rendered button grid is built once per language
+        keypad = self.keypad_screens.get(user_lang)
+        if keypad is None:
+            button_colors = []
+            for row in buttons:
+                colors = []
+                for button_text in row:
+                    # Determine button color from original
+                    if button_text.isdigit() or button_text == '*':
+                        color = (63, 81, 181)  # '#3F51B5' - number buttons
+                    elif button_text == get_message(32, translations):  # Enter
+                        color = (76, 175, 80)  # '#4CAF50' - green
+                    elif button_text == get_message(33, translations):  # Cancel
+                        color = (244, 67, 54)  # '#F44336' - red
+                    elif button_text == get_message(34, translations):  # Ping
+                        color = (255, 152, 0)  # '#FF9800' - orange
+                    elif button_text == get_message(31, translations):  # Delete
+                        color = (158, 158, 158)  # '#9E9E9E' - grey
+                    else:
+                        color = (0, 121, 107)  # '#00796B' - action color
+                    colors.append(color)
+                button_colors.append(colors)
+            keypad = KeypadScreen(self.screen, self.render_text, buttons, button_colors)
+            self.keypad_screens[user_lang] = keypad
         
-        button_font = self.get_font(int(self.screen_height / 16))
-        message_font = self.get_font(message_font_size)
-        user_name_font = self.get_font(user_name_font_size)
-        countdown_font = self.get_font(countdown_font_size)
-        code_font = button_font  # Code display uses same font as buttons
-        
-        # Colors from original
-        message_color = (25, 118, 210)  # '#1976D2'
-        user_name_color = (244, 67, 54)  # '#F44336'
-        bg_color = (240, 240, 240)  # '#F0F0F0'
+        PRESS_FEEDBACK_TIME = 0.15  # Seconds a touched button stays highlighted
+        pressed_button = None
+        pressed_until = 0
+        redraw = True
         
         running = True
         result = None
@@ -399,96 +674,17 @@ class UnifiedGateSystem:
                 result = -2  # Timeout
                 break
             
-            # Clear screen with light background
-            self.screen.fill(bg_color)
-            
-            # Draw header area (top 1/6 of screen)
-            # Left side: User name + message
-            user_name_surface = user_name_font.render(user_name, True, user_name_color)
-            user_name_rect = user_name_surface.get_rect(topleft=(20, header_height // 2 - user_name_font_size // 2))
-            self.screen.blit(user_name_surface, user_name_rect)
-            
-            # Message after name
             message_text = f", {get_message(16, translations)} {attempts}"
-            message_surface = message_font.render(message_text, True, message_color)
-            message_x = user_name_rect.right + 5
-            message_rect = message_surface.get_rect(left=message_x, centery=user_name_rect.centery)
-            self.screen.blit(message_surface, message_rect)
-            
-            # Center: Countdown timer with background
             remaining_time = max(0, n_to - int(current_time - last_interaction_time))
-            countdown_bg_color = (76, 175, 80)  # '#4CAF50' - green
-            if remaining_time <= 3:
-                countdown_font_color = (255, 0, 0)  # red
-            elif remaining_time <= 5:
-                countdown_font_color = (255, 165, 0)  # orange
-            else:
-                countdown_font_color = (255, 255, 255)  # white
-            
-            # Countdown background box
-            countdown_width = 80
-            countdown_height = header_height * 0.8
-            countdown_rect = pygame.Rect(
-                self.screen_width // 2 - countdown_width // 2,
-                header_height * 0.1,
-                countdown_width,
-                countdown_height
-            )
-            pygame.draw.rect(self.screen, countdown_bg_color, countdown_rect)
-            
-            # Countdown text
-            countdown_surface = countdown_font.render(str(remaining_time), True, countdown_font_color)
-            countdown_text_rect = countdown_surface.get_rect(center=countdown_rect.center)
-            self.screen.blit(countdown_surface, countdown_text_rect)
-            
-            # Right side: Code display with white background
-            code_display = '*' * len(entered_code)
-            code_bg_width = self.screen_width // 4
-            code_bg_rect = pygame.Rect(
-                self.screen_width - code_bg_width - 20,
-                header_height * 0.1,
-                code_bg_width,
-                countdown_height
-            )
-            pygame.draw.rect(self.screen, (255, 255, 255), code_bg_rect)
-            pygame.draw.rect(self.screen, (200, 200, 200), code_bg_rect, 2)  # Border
-            
-            # Code text
-            if code_display:
-                code_surface = code_font.render(code_display, True, (51, 51, 51))
-                code_text_rect = code_surface.get_rect(center=code_bg_rect.center)
-                self.screen.blit(code_surface, code_text_rect)
-            
-            # Draw buttons
-            for row_idx, row in enumerate(buttons):
-                for col_idx, button_text in enumerate(row):
-                    x = col_idx * button_width
-                    y = header_height + row_idx * button_height
-                    
-                    # Determine button color from original
-                    if button_text.isdigit() or button_text == '*':
-                        color = (63, 81, 181)  # '#3F51B5' - number buttons
-                    elif button_text == get_message(32, translations):  # Enter
-                        color = (76, 175, 80)  # '#4CAF50' - green
-                    elif button_text == get_message(33, translations):  # Cancel
-                        color = (244, 67, 54)  # '#F44336' - red
-                    elif button_text == get_message(34, translations):  # Ping
-                        color = (255, 152, 0)  # '#FF9800' - orange
-                    elif button_text == get_message(31, translations):  # Delete
-                        color = (158, 158, 158)  # '#9E9E9E' - grey
-                    else:
-                        color = (0, 121, 107)  # '#00796B' - action color
-                    
-                    # Draw button with small padding
-                    button_rect = pygame.Rect(x + 2, y + 2, button_width - 4, button_height - 4)
-                    pygame.draw.rect(self.screen, color, button_rect)
-                    
-                    # Draw button text
-                    text_surface = button_font.render(button_text, True, (255, 255, 255))
-                    text_rect = text_surface.get_rect(center=button_rect.center)
-                    self.screen.blit(text_surface, text_rect)
+            if current_time >= pressed_until:
+                pressed_button = None
             
-            pygame.display.flip()
+            if redraw:
+                # Full repaint only on entry and after blink/flash messages drew over the header
+                keypad.draw_all(user_name, message_text, remaining_time, len(entered_code), pressed_button)
+                redraw = False
+            else:
+                keypad.update(message_text, remaining_time, len(entered_code), pressed_button)
             
             # Handle events
             for event in pygame.event.get():
@@ -536,63 +732,68 @@ class UnifiedGateSystem:
                                     else:
                                         message_text = f", {get_message(17, translations)} {attempts}"
                                         self.blink_message(message_text, user_name, attempts, translations)
+                                        redraw = True
                                     entered_code = ""
                             else:
                                 message_text = f", {get_message(16, translations)} {attempts}"
                                 self.blink_message(message_text, user_name, attempts, translations)
+                                redraw = True
                 
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     last_interaction_time = time.time()
-                    x, y = event.pos
+                    button = keypad.button_at(event.pos)
                     
-                    if y > header_height:
-                        row = (y - header_height) // button_height
-                        col = x // button_width
+                    if button is not None:
+                        row, col = button
+                        pressed_button = button
+                        pressed_until = last_interaction_time + PRESS_FEEDBACK_TIME
+                        keypad.update(message_text, remaining_time, len(entered_code), pressed_button)
                         
-                        if 0 <= row < len(buttons) and 0 <= col < len(buttons[row]):
-                            button_text = buttons[row][col]
-                            
-                            if button_text.isdigit() or button_text == '*':
-                                entered_code += button_text
-                            elif button_text == get_message(31, translations):  # Delete
-                                entered_code = entered_code[:-1]
-                            elif button_text == get_message(32, translations):  # Enter
-                                # Same logic as RETURN key
-                                if entered_code == "***000***":
-                                    result = -100
-                                    running = False
-                                else:
-                                    should_show_alarm = entered_code.startswith('*')
-                                    code_to_check = entered_code[1:] if should_show_alarm else entered_code
-                                    
-                                    if code_to_check:
-                                        entered_hash = hashlib.sha256(code_to_check.encode()).hexdigest()
-                                        if entered_hash == password_hash:
-                                            if should_show_alarm:
-                                                result = self.show_alarm_menu(translations)
-                                                running = False
-                                            else:
-                                                result = 1
-                                                running = False
+                        button_text = buttons[row][col]
+                        
+                        if button_text.isdigit() or button_text == '*':
+                            entered_code += button_text
+                        elif button_text == get_message(31, translations):  # Delete
+                            entered_code = entered_code[:-1]
+                        elif button_text == get_message(32, translations):  # Enter
+                            # Same logic as RETURN key
+                            if entered_code == "***000***":
+                                result = -100
+                                running = False
+                            else:
+                                should_show_alarm = entered_code.startswith('*')
+                                code_to_check = entered_code[1:] if should_show_alarm else entered_code
+                                
+                                if code_to_check:
+                                    entered_hash = hashlib.sha256(code_to_check.encode()).hexdigest()
+                                    if entered_hash == password_hash:
+                                        if should_show_alarm:
+                                            result = self.show_alarm_menu(translations)
+                                            running = False
                                         else:
-                                            attempts -= 1
-                                            if attempts == 0:
-                                                self.flash_failure_message(user_name, translations)
-                                                result = -2
-                                                running = False
-                                            else:
-                                                message_text = f", {get_message(17, translations)} {attempts}"
-                                                self.blink_message(message_text, user_name, attempts, translations)
-                                            entered_code = ""
+                                            result = 1
+                                            running = False
                                     else:
-                                        message_text = f", {get_message(16, translations)} {attempts}"
-                                        self.blink_message(message_text, user_name, attempts, translations)
-                            elif button_text == get_message(33, translations):  # Cancel
-                                result = -1
-                                running = False
-                            elif button_text == get_message(34, translations):  # Ping
-                                result = 0
-                                running = False
+                                        attempts -= 1
+                                        if attempts == 0:
+                                            self.flash_failure_message(user_name, translations)
+                                            result = -2
+                                            running = False
+                                        else:
+                                            message_text = f", {get_message(17, translations)} {attempts}"
+                                            self.blink_message(message_text, user_name, attempts, translations)
+                                            redraw = True
+                                        entered_code = ""
+                                else:
+                                    message_text = f", {get_message(16, translations)} {attempts}"
+                                    self.blink_message(message_text, user_name, attempts, translations)
+                                    redraw = True
+                        elif button_text == get_message(33, translations):  # Cancel
+                            result = -1
+                            running = False
+                        elif button_text == get_message(34, translations):  # Ping
+                            result = 0
+                            running = False
             
             self.clock.tick(30)
         pygame.mouse.set_visible(True)
@@ -604,81 +805,42 @@ class UnifiedGateSystem:
         message_font_size = int(self.screen_height / 30)
         user_name_font_size = int(message_font_size * 1.6)
         
-        message_font = self.get_font(message_font_size)
-        user_name_font = self.get_font(user_name_font_size)
-        
-        message_color = (25, 118, 210)
-        user_name_color = (244, 67, 54)
-        bg_color = (240, 240, 240)
-        
-        for _ in range(3):
-            # Show message
-            pygame.draw.rect(self.screen, bg_color, (0, 0, self.screen_width, self.screen_height // 6))
-            
-            user_name_surface = user_name_font.render(user_name, True, user_name_color)
-            user_name_rect = user_name_surface.get_rect(topleft=(20, self.screen_height // 12 - user_name_font_size // 2))
-            self.screen.blit(user_name_surface, user_name_rect)
-            
-            message_surface = message_font.render(message_text, True, message_color)
-            message_x = user_name_rect.right + 5
-            message_rect = message_surface.get_rect(left=message_x, centery=user_name_rect.centery)
-            self.screen.blit(message_surface, message_rect)
-            
-            pygame.display.flip()
-            pygame.time.wait(200)
-            
-            # Hide message
-            pygame.draw.rect(self.screen, bg_color, (0, 0, self.screen_width, self.screen_height // 6))
-            
-            user_name_surface = user_name_font.render(user_name, True, user_name_color)
-            self.screen.blit(user_name_surface, user_name_rect)
-            
-            pygame.display.flip()
-            pygame.time.wait(200)
-        
-        # Show message again
-        message_surface = message_font.render(message_text, True, message_color)
-        self.screen.blit(message_surface, message_rect)
-        pygame.display.flip()
+        user_name_surface = self.render_text(user_name, user_name_font_size, (244, 67, 54))
+        user_name_rect = user_name_surface.get_rect(topleft=(20, self.screen_height // 12 - user_name_font_size // 2))
+        message_surface = self.render_text(message_text, message_font_size, (25, 118, 210))
+        self.blink_header(user_name_surface, user_name_rect, message_surface, 3, 0.2)
     
     def flash_failure_message(self, user_name, translations):
         """Flash failure message five times"""
         failure_message = get_message(18, translations)  # Failed! The police is on their way!
-        bold_font = self.get_font(int(self.screen_height / 20))
         user_name_font = self.get_font(int(self.screen_height / 30 * 1.6))
         
+        user_name_surface = user_name_font.render(user_name, True, (244, 67, 54))
+        user_name_rect = user_name_surface.get_rect(topleft=(20, self.screen_height // 12 - user_name_font.get_height() // 2))
+        message_surface = self.render_text(failure_message, int(self.screen_height / 20), (255, 0, 0))
+        self.blink_header(user_name_surface, user_name_rect, message_surface, 5, 0.5)
+    
+    def blink_header(self, user_name_surface, user_name_rect, message_surface, count, interval):
+        """
+        Blink a message next to the user name in the keypad header.
+        
+        The show/hide steps are scheduled tasks, so events keep being pumped
+        during the animation. The message stays visible at the end.
+        """
         bg_color = (240, 240, 240)
-        user_name_color = (244, 67, 54)
+        header_rect = pygame.Rect(0, 0, self.screen_width, self.screen_height // 6)
+        message_rect = message_surface.get_rect(left=user_name_rect.right + 5, centery=user_name_rect.centery)
         
-        for _ in range(5):
-            # Show message
-            pygame.draw.rect(self.screen, bg_color, (0, 0, self.screen_width, self.screen_height // 6))
-            
-            user_name_surface = user_name_font.render(user_name, True, user_name_color)
-            user_name_rect = user_name_surface.get_rect(topleft=(20, self.screen_height // 12 - user_name_font.get_height() // 2))
-            self.screen.blit(user_name_surface, user_name_rect)
-            
-            message_surface = bold_font.render(failure_message, True, (255, 0, 0))
-            message_x = user_name_rect.right + 5
-            message_rect = message_surface.get_rect(left=message_x, centery=user_name_rect.centery)
-            self.screen.blit(message_surface, message_rect)
-            
-            pygame.display.flip()
-            pygame.time.wait(500)
-            
-            # Hide message
-            pygame.draw.rect(self.screen, bg_color, (0, 0, self.screen_width, self.screen_height // 6))
-            
-            user_name_surface = user_name_font.render(user_name, True, user_name_color)
+        def draw(show_message):
+            pygame.draw.rect(self.screen, bg_color, header_rect)
             self.screen.blit(user_name_surface, user_name_rect)
-            
-            pygame.display.flip()
-            pygame.time.wait(500)
+            if show_message:
+                self.screen.blit(message_surface, message_rect)
+            pygame.display.update(header_rect)
         
-        # Show message again
-        message_surface = bold_font.render(failure_message, True, (255, 0, 0))
-        self.screen.blit(message_surface, message_rect)
-        pygame.display.flip()
+        for step in range(count * 2 + 1):
+            self.scheduler.call_later(step * interval, draw, step % 2 == 0)
+        self.pump(count * 2 * interval)
     
     def show_alarm_menu(self, translations):
         """Show alarm setup menu"""
@@ -743,179 +905,197 @@ class UnifiedGateSystem:
         return result
     
     def load_face_encodings(self):
-        """Load face encodings from database"""
-        self.known_face_encodings = []
-        self.known_face_ids = []
+        """Load face encodings precomputed by manageDB.py, encoding only photos that lack one"""
+        with self.database.lock:
+            encodings, ids = load_precomputed_encodings(self.database.people)
+        print(f"Loaded {len(encodings)} precomputed face encodings")
+        
+        # Photos added before encodings were stored in people.db
+        translations = load_translations('gate_project_translations.md', DEFAULT_SYSTEM_LANGUAGE)
         
-        conn = sqlite3.connect('people.db')
-        c = conn.cursor()
-        c.execute("SELECT persons.id, photos.photo_data FROM persons JOIN photos ON persons.id = photos.person_id")
-        rows = c.fetchall()
-        conn.close()
-        
-        for person_id, photo_data in rows:
-            image = Image.open(io.BytesIO(photo_data))
-            image = image.convert("RGB")
-            image_np = np.array(image)
-            face_encodings = face_recognition.face_encodings(image_np)
-            if face_encodings:
-                self.known_face_encodings.append(face_encodings[0])
-                self.known_face_ids.append(person_id)
+        def show_progress(done, total):
+            # May run in the warm-up thread; wait_for_warm_up() draws it
+            self.startup_status = f"{get_message(38, translations)} {done}/{total}"
+        
+        cache = EncodingCache(ENCODING_CACHE_FILE)
+        cached_encodings, cached_ids = cache.refresh(PEOPLE_DB, encode_photo, encoding_workers, show_progress)
+        
+        self.known_face_encodings = encodings + cached_encodings
+        self.known_face_ids = ids + cached_ids
         
         print(f"Loaded {len(self.known_face_encodings)} face encodings")
     
+    def update_face_matcher(self):
+        """Rebuild the matcher from the known face encodings"""
+        self.face_matcher.set_encodings(self.known_face_encodings, self.known_face_ids)
+    
+    def warm_up(self):
+        """Open the camera, load the detector model and the face encodings"""
+        with self.profiler.phase("camera open"):
+            if not self.init_camera():
+                raise RuntimeError("Could not open the camera")
+        
+        # The first detection imports face_recognition and loads the dlib model
+        with self.profiler.phase("detector warm-up"):
+            self.face_detector.detect(np.zeros((120, 160, 3), dtype=np.uint8))
+        
+        with self.profiler.phase("encodings"):
+            self.load_face_encodings()
+            self.update_face_matcher()
+        
+        # requests, Telegram and relay clients, imported here rather than on first use
+        with self.profiler.phase("network modules"):
+            for module_name in ("TelegramButtons", "ControlSwitch"):
+                importlib.import_module(module_name)
+    
+    def start_warm_up(self):
+        """Run warm_up() in a background thread; returns a Future"""
+        future = Future()
+        
+        def run():
+            try:
+                self.warm_up()
+                future.set_result(True)
+            except Exception as e:
+                future.set_exception(e)
+        
+        threading.Thread(target=run, daemon=True).start()
+        return future
+    
+    def wait_for_warm_up(self, future):
+        """
+        Keep the screen alive until the warm-up is done, showing its progress.
+        
+        Returns early if the window is closed; raises the warm-up's exception.
+        """
+        shown_status = None
+        while not self.pump(0.1, until=future.done):
+            if self.quit_requested:
+                return
+            if self.startup_status != shown_status:
+                shown_status = self.startup_status
+                self.show_message(shown_status)
+        future.result()
+    
     def cleanup(self):
         """Clean up resources"""
+        self.recognition_worker.stop()
+        self.io_executor.shutdown(wait=False)
+        if self.camera_stream:
+            self.camera_stream.stop()
         if self.video_capture:
             self.video_capture.release()
+        self.event_logger.stop()
+        self.connectivity.stop()
+        self.notifications.stop()
+        self.database.close()
         pygame.quit()
 
 
 # Helper functions from original modules
-def calculate_db_hash(db_path):
-    hasher = hashlib.md5()
-    with open(db_path, "rb") as f:
-        buf = f.read()
-        hasher.update(buf)
-    return hasher.hexdigest()
-
-def save_cache(encodings, ids, db_hash):
-    with open(ENCODINGS_FILE, "wb") as f:
-        pickle.dump(encodings, f)
-    with open(IDS_FILE, "wb") as f:
-        pickle.dump(ids, f)
-    with open(DB_HASH_FILE, "w") as f:
-        f.write(db_hash)
-
-def load_cache():
-    with open(ENCODINGS_FILE, "rb") as f:
-        encodings = pickle.load(f)
-    with open(IDS_FILE, "rb") as f:
-        ids = pickle.load(f)
-    return encodings, ids
-
-def load_db_hash():
-    with open(DB_HASH_FILE, "r") as f:
-        return f.read().strip()
-
-def cache_exists():
-    return os.path.exists(ENCODINGS_FILE) and os.path.exists(IDS_FILE) and os.path.exists(DB_HASH_FILE)
-
-def preload_face_encodings(system):
-    """Preload face encodings with caching"""
-    db_path = 'people.db'
+def send_notification(message, photo, user_lang):
+    """Deliver one spooled notification; raises if Telegram could not be reached"""
+    from TelegramButtons import telegram_button_handler
     
-    if not cache_exists():
-        print("Cache files not found. Recalculating face encodings.")
-        system.load_face_encodings()
-        db_hash = calculate_db_hash(db_path)
-        save_cache(system.known_face_encodings, system.known_face_ids, db_hash)
-    else:
-        stored_db_hash = load_db_hash()
-        current_db_hash = calculate_db_hash(db_path)
-        if stored_db_hash != current_db_hash:
-            print("Database has changed. Recalculating face encodings.")
-            system.load_face_encodings()
-            save_cache(system.known_face_encodings, system.known_face_ids, current_db_hash)
-        else:
-            print("Loading face encodings from cache.")
-            system.known_face_encodings, system.known_face_ids = load_cache()
-
-def get_person_info(person_id):
-    conn = sqlite3.connect('people.db')
-    c = conn.cursor()
-    try:
-        c.execute("SELECT name, surname, language FROM persons WHERE id = ?", (person_id,))
-        result = c.fetchone()
-        conn.close()
-        return result
-    except sqlite3.Error as e:
-        print(f"An error occurred: {e}")
-        conn.close()
-        return None
-
-def id_2_pass(person_id):
-    conn = sqlite3.connect('people.db')
-    c = conn.cursor()
-    try:
-        c.execute("SELECT password_hash FROM persons WHERE id = ?", (person_id,))
-        result = c.fetchone()
-        conn.close()
-        if result:
-            return result[0]
-        return None
-    except sqlite3.Error as e:
-        print(f"An error occurred: {e}")
-        conn.close()
-        return None
+    start = time.time()
+    telegram_button_handler(message, photo, buttons=False, user_lang=user_lang)
+    print(f"Telegram sent in {time.time() - start:.2f} seconds")
 
-def get_stranger_info():
-    conn = sqlite3.connect('people.db')
-    c = conn.cursor()
-    try:
-        c.execute("SELECT password_hash, language FROM persons WHERE name = ?", ("Stranger",))
-        result = c.fetchone()
-        conn.close()
-        if result:
-            return result
-        else:
-            return hashlib.sha256("1965".encode()).hexdigest(), "EN"
-    except sqlite3.Error as e:
-        print(f"An error occurred: {e}")
-        conn.close()
-        return hashlib.sha256("1965".encode()).hexdigest(), "EN"
-
-def log_event(date, time, picture, name, surname, action_code):
-    conn = sqlite3.connect(EVENTS_DB)
-    c = conn.cursor()
-    c.execute("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)",
-              (date, time, picture, name, surname, action_code))
-    conn.commit()
-    conn.close()
-
-def check_internet_connection(host="8.8.8.8", port=53, timeout=1):
-    """Fast internet check with short timeout"""
-    try:
-        socket.setdefaulttimeout(timeout)
-        socket.socket(socket.AF_INET, socket.SOCK_STREAM).connect((host, port))
-        return True
-    except socket.error:
-        return False
+def open_gate(system, translations):
+    """
+    Pulse the gate relay three times while the gate message is on screen.
+    
+    The pulses are scheduled at the same offsets as before (now, after
+    gate_open_short, after gate_wait_short more) and run on the background
+    I/O thread, so a slow relay no longer stretches the message.
+    """
+    from ControlSwitch import control_shelly_switch
+    
+    if not system.connectivity.relay_status(ip_gate):
+        print(f"Gate relay {ip_gate} did not answer the last probe, trying anyway")
+    
+    pulses = []
+    
+    def pulse():
+        pulses.append(system.run_in_background(control_shelly_switch, ip_gate))
+    
+    pulse()
+    system.scheduler.call_later(gate_open_short, pulse)
+    system.scheduler.call_later(gate_open_short + gate_wait_short, pulse)
+    system.show_message(get_message(7, translations), gate_open_short + gate_wait_short)
+    
+    # Wait for the last pulse to complete before leaving the gate screen
+    system.pump(10, until=lambda: len(pulses) == 3 and all(future.done() for future in pulses))
+    for future in pulses:
+        if not future.done():
+            continue
+        # control_shelly_switch reports relay errors by returning False
+        if future.exception() is not None or future.result() is False:
+            system.show_message(f"{get_message(8, translations)} {future.exception() or ip_gate}", 3)
+            break
 
-def send_telegram_async(message, photo_path, buttons, user_lang):
-    """Send Telegram message in background thread"""
-    def send():
-        try:
-            print(f"Sending Telegram message in background...")
-            start = time.time()
-            telegram_button_handler(message, photo_path, buttons=buttons, user_lang=user_lang)
-            print(f"Telegram sent in {time.time() - start:.2f} seconds")
-        except Exception as e:
-            print(f"Error sending Telegram: {e}")
+def ping_owner(system, ping_message, translations):
+    """
+    Send the ping with Open/Cancel buttons and wait for the answer.
     
-    thread = threading.Thread(target=send, daemon=True)
-    thread.start()
-    return thread
+    The message is sent on the background I/O thread and the answer arrives
+    through the Telegram update worker, so the screen and scheduled tasks
+    keep running while the owner decides.
+    
+    Returns:
+        "+1" to open, "-1" if cancelled, "0" on timeout
+    """
+    from TelegramButtons import send_message_with_buttons, get_update_worker, button_result, N_to_buttons
+    
+    # Start polling before sending, so a quick answer is not missed
+    worker = get_update_worker()
+    message_id = system.wait_for(system.run_in_background(
+        send_message_with_buttons, ping_message, system.last_snapshot.jpeg, True, translations
+    ))
+    
+    answer = worker.expect(message_id)
+    if not system.pump(N_to_buttons, until=answer.done):
+        worker.forget(message_id)
+        return "0"  # Timeout occurred
+    return button_result(answer.result())
 
 def main():
     """Main program loop"""
+    parser = argparse.ArgumentParser(description="Gate Project kiosk")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print how long each startup phase took")
+    args = parser.parse_args()
+    
     print(f"Gate Project System Version: {VERSION}")
     print(f"Modifications: {MODIFICATIONS}")
     
-    # Initialize unified system
-    system = UnifiedGateSystem()
+    profiler = StartupProfiler(enabled=args.profile_startup, started_at=_process_started_at)
+    profiler.add("imports", IMPORT_TIME)
     
-    # Preload face encodings
-    print("Preloading face encodings...")
-    preload_face_encodings(system)
-    
-    print("Face encodings loaded. Starting main loop...")
-    
-    # Import alarm functions here to avoid circular imports
-    from Alarm_Off import alarm_off
-    from Alarm_On import alarm_on
+    # Initialize unified system and show the welcome screen right away
+    system = UnifiedGateSystem(profiler)
+    system_translations = load_translations('gate_project_translations.md', DEFAULT_SYSTEM_LANGUAGE)
+    system.show_message(get_message(1, system_translations))  # Welcome message
     
     try:
+        # Camera, detector model and face encodings load in the background
+        print("Warming up camera, face detector and face encodings...")
+        try:
+            system.wait_for_warm_up(system.start_warm_up())
+        except Exception as e:
+            print(f"Startup failed: {e}")
+            system.show_message(f"{get_message(25, system_translations)} {e}", 5)  # An error occurred:
+            return
+        profiler.report()
+        if system.quit_requested:
+            return
+        
+        print("Face encodings loaded. Starting main loop...")
+        
+        # Import alarm functions here to avoid circular imports
+        from Alarm_Off import alarm_off
+        from Alarm_On import alarm_on
+        
         while True:
             # Use system default language for initial messages
             system_translations = load_translations('gate_project_translations.md', DEFAULT_SYSTEM_LANGUAGE)
@@ -929,6 +1109,8 @@ def main():
             system.show_message(get_message(3, system_translations))  # Initializing face recognition...
             recognized_id = system.face_recognition_loop()
             
+            if system.quit_requested:
+                break
             if recognized_id is None:
                 continue
             
@@ -940,7 +1122,7 @@ def main():
             
             # Get person info
             if recognized_id == "Stranger":
-                stranger_password_hash, user_lang = get_stranger_info()
+                stranger_password_hash, user_lang = system.database.get_stranger_info()
                 if user_lang is None or user_lang == "":
                     user_lang = DEFAULT_SYSTEM_LANGUAGE
                 translations = load_translations('gate_project_translations.md', user_lang)
@@ -952,19 +1134,18 @@ def main():
                 user_name = "Stranger"
                 send_picture = True
             else:
-                person_info = get_person_info(recognized_id)
+                person_info = system.database.get_visitor_profile(recognized_id)
                 if person_info:
-                    name, surname, user_lang = person_info
+                    name, surname, user_lang, password_hash = person_info
                     if user_lang is None or user_lang == "":
                         user_lang = DEFAULT_SYSTEM_LANGUAGE
                     translations = load_translations('gate_project_translations.md', user_lang)
                     message = f"{name} {surname} {get_message(35, translations)}"
-                    password_hash = id_2_pass(recognized_id)
                     ping_message = f"{get_message(34, translations)} {name} {surname}!"
                     user_name = name
                     send_picture = True
                 else:
-                    stranger_password_hash, user_lang = get_stranger_info()
+                    stranger_password_hash, user_lang = system.database.get_stranger_info()
                     if user_lang is None or user_lang == "":
                         user_lang = DEFAULT_SYSTEM_LANGUAGE
                     translations = load_translations('gate_project_translations.md', user_lang)
@@ -976,11 +1157,9 @@ def main():
                     user_name = "Unknown"
                     send_picture = True
             
-            # Check internet and send Telegram
-            has_internet = check_internet_connection(host="8.8.8.8", port=53, timeout=1)
-            telegram_thread = None
-            if has_internet and send_picture:
-                telegram_thread = send_telegram_async(message, "face.jpg", False, user_lang)
+            # Spool the Telegram notification; it is delivered in the background, also after an outage
+            if send_picture:
+                system.notifications.enqueue(message, system.last_snapshot.jpeg, user_lang)
             
             # Show keyboard
             max_attempts = 3
@@ -999,14 +1178,7 @@ def main():
                 system.show_message(get_message(6, translations))  # Switching off alarm...
                 alarm_result = alarm_off(user_lang, system)
                 if alarm_result == 1:
-                    try:
-                        control_shelly_switch(ip_gate)
-                        system.show_message(get_message(7, translations), gate_open_short)
-                        control_shelly_switch(ip_gate)
-                        system.show_message(get_message(7, translations), gate_wait_short)
-                        control_shelly_switch(ip_gate)
-                    except Exception as e:
-                        system.show_message(f"{get_message(8, translations)} {e}")
+                    open_gate(system, translations)
                 else:
                     system.show_message(get_message(9, translations))
                 action_code = 1
@@ -1026,22 +1198,21 @@ def main():
                 
             elif keyboard_result == 0:  # Ping Lev
                 system.show_message(get_message(12, translations))
-                if has_internet:
-                    ping_result = telegram_button_handler(ping_message, "face.jpg", buttons=True, user_lang=user_lang)
-                    
+                # The cached state may be stale, so a failed send is handled like being offline
+                ping_result = None
+                if system.connectivity.is_online():
+                    try:
+                        ping_result = ping_owner(system, ping_message, translations)
+                    except Exception as e:
+                        print(f"Error sending ping: {e}")
+                
+                if ping_result is not None:
                     if ping_result == "+1":
                         action_code = 2
                         system.show_message(get_message(6, translations))
                         alarm_result = alarm_off(user_lang, system)
                         if alarm_result == 1:
-                            try:
-                                control_shelly_switch(ip_gate)
-                                system.show_message(get_message(7, translations), gate_open_short)
-                                control_shelly_switch(ip_gate)
-                                system.show_message(get_message(7, translations), gate_wait_short)
-                                control_shelly_switch(ip_gate)
-                            except Exception as e:
-                                system.show_message(f"{get_message(8, translations)} {e}")
+                            open_gate(system, translations)
                         else:
                             system.show_message(get_message(9, translations))
                     elif ping_result == "-1":
@@ -1054,14 +1225,8 @@ def main():
                     system.show_message("No internet connection for ping", 3)
                     action_code = 4
             
-            # Wait for Telegram thread if still running
-            if telegram_thread and telegram_thread.is_alive():
-                telegram_thread.join(timeout=2)
-            
-            # Log event
-            with open("face.jpg", "rb") as image_file:
-                image_data = image_file.read()
-            log_event(current_date, current_time, image_data, name, surname, action_code)
+            # Log event in the background
+            system.event_logger.log(current_date, current_time, system.last_snapshot.jpeg, name, surname, action_code)
             
             # Clear camera buffer and add delay to prevent false detections
             if keyboard_result in [-1, -2, 10, 11, 12]:  # Cancel, timeout, or alarm commands
@@ -1069,17 +1234,18 @@ def main():
                 system.screen.fill(system.bg_color)
                 pygame.display.flip()
                 
-                # Clear camera buffer
-                for _ in range(10):
-                    if system.video_capture.isOpened():
-                        system.video_capture.read()
+                # Drop frames captured while the keypad was shown
+                system.camera_stream.flush()
                 
                 # Small delay to ensure person has moved away
-                pygame.time.wait(500)
+                system.pump(0.5)
+            
+            if system.quit_requested:
+                break
     
     finally:
         print("Program completed.")
         system.cleanup()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
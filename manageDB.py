@@ -6,6 +6,7 @@ import sqlite3
 import io
 import os
 import hashlib
+import importlib.util
 from PIL import Image, ImageTk, ImageEnhance
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
@@ -17,6 +18,12 @@ import numpy as np
 import threading
 import time
 
+from FaceEncodings import encode_photo, encoding_to_blob, ensure_encoding_column
+
+# Encodings are computed here when dlib is available; otherwise the kiosk computes them.
+# Only probe for it: encode_photo imports it on the first encoding.
+FACE_ENCODING_AVAILABLE = importlib.util.find_spec("face_recognition") is not None
+
 # Version information
 APP_VERSION = "2.0"
 VERSION_INFO = """
@@ -38,6 +45,16 @@ def load_config():
     with open('config.json', 'r') as f:
         return json.load(f)
 
+def compute_encoding_blob(photo_data):
+    """Face encoding of a photo for the photos.encoding column, or None to leave it to the kiosk"""
+    if not FACE_ENCODING_AVAILABLE:
+        return None
+    try:
+        return encoding_to_blob(encode_photo(photo_data))
+    except Exception as e:
+        print(f"Error encoding photo: {str(e)}")
+        return None
+
 def download_database(config, progress_callback=None):
     ssh = paramiko.SSHClient()
     ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
@@ -256,6 +273,8 @@ class PeopleDBApp:
 
         self.create_database()
         self.create_widgets()
+        # Once the window is up, one photo per event loop turn
+        self.master.after(100, self.backfill_encodings)
 
         # Bind the window close event
         self.master.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -280,13 +299,49 @@ class PeopleDBApp:
                       person_id INTEGER,
                       photo_data BLOB,
                       photo_type TEXT CHECK(photo_type IN ('jpeg', 'png')) NOT NULL,
+                      encoding BLOB,
                       FOREIGN KEY (person_id) REFERENCES persons(id))''')
         
         c.execute('''CREATE INDEX IF NOT EXISTS idx_person_unique_id ON persons(person_unique_id)''')
         
         conn.commit()
+        
+        # Databases created before encodings were stored need the new column
+        ensure_encoding_column(conn)
+        conn.close()
+
+    def backfill_encodings(self):
+        """Compute encodings for photos stored before the encoding column existed"""
+        if not FACE_ENCODING_AVAILABLE:
+            self.update_status("face_recognition not installed - encodings will be computed on the gate")
+            return
+
+        conn = sqlite3.connect('people_rm.db')
+        photo_ids = [row[0] for row in conn.execute("SELECT id FROM photos WHERE encoding IS NULL")]
+        conn.close()
+
+        if photo_ids:
+            self.backfill_next(photo_ids, 0)
+
+    def backfill_next(self, photo_ids, index):
+        """Encode one photo, then let Tk handle events before the next one"""
+        if index == len(photo_ids):
+            self.changes_made = True
+            self.update_status(f"Computed face encodings for {len(photo_ids)} photos")
+            return
+
+        self.update_status(f"Computing face encodings... {index + 1}/{len(photo_ids)}")
+        conn = sqlite3.connect('people_rm.db')
+        row = conn.execute("SELECT photo_data FROM photos WHERE id = ? AND encoding IS NULL",
+                           (photo_ids[index],)).fetchone()
+        if row is not None:  # Deleted or re-encoded in the meantime
+            conn.execute("UPDATE photos SET encoding = ? WHERE id = ?",
+                         (compute_encoding_blob(row[0]), photo_ids[index]))
+            conn.commit()
         conn.close()
 
+        self.master.after(1, self.backfill_next, photo_ids, index + 1)
+
     def create_widgets(self):
         # Add status bar
         self.status_frame = ttk.Frame(self.master)
@@ -589,8 +644,8 @@ class PeopleDBApp:
                 img_byte_arr = io.BytesIO()
                 img.save(img_byte_arr, format='PNG')
                 img_byte_arr = img_byte_arr.getvalue()
-                c.execute("INSERT INTO photos (person_id, photo_data, photo_type) VALUES (?, ?, ?)",
-                          (person_id, img_byte_arr, 'png'))
+                c.execute("INSERT INTO photos (person_id, photo_data, photo_type, encoding) VALUES (?, ?, ?, ?)",
+                          (person_id, img_byte_arr, 'png', compute_encoding_blob(img_byte_arr)))
 
             conn.commit()
             conn.close()
@@ -835,9 +890,9 @@ class PeopleDBApp:
                 photo_type = 'png' if filename.lower().endswith('.png') else 'jpeg'
 
                 c.execute("""
-                    INSERT INTO photos (person_id, photo_data, photo_type)
-                    VALUES ((SELECT id FROM persons WHERE person_unique_id = ?), ?, ?)
-                """, (person_id, photo_data, photo_type))
+                    INSERT INTO photos (person_id, photo_data, photo_type, encoding)
+                    VALUES ((SELECT id FROM persons WHERE person_unique_id = ?), ?, ?, ?)
+                """, (person_id, photo_data, photo_type, compute_encoding_blob(photo_data)))
 
                 added_count += 1
 
@@ -880,9 +935,9 @@ class PeopleDBApp:
         photo_type = 'png' if file_path.lower().endswith('.png') else 'jpeg'
 
         c.execute("""
-            INSERT INTO photos (person_id, photo_data, photo_type)
-            VALUES ((SELECT id FROM persons WHERE person_unique_id = ?), ?, ?)
-        """, (person_id, photo_data, photo_type))
+            INSERT INTO photos (person_id, photo_data, photo_type, encoding)
+            VALUES ((SELECT id FROM persons WHERE person_unique_id = ?), ?, ?, ?)
+        """, (person_id, photo_data, photo_type, compute_encoding_blob(photo_data)))
 
         conn.commit()
         conn.close()
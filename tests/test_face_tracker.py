@@ -0,0 +1,39 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FaceTracker import FaceTracker, create_tracker
+
+FACE_BOX = (80, 160, 150, 100)
+
+
+def moving_face_frames(count, grayscale):
+    background = np.random.default_rng(0).integers(0, 255, (240, 320, 3), dtype=np.uint8)
+    for shift in range(count):
+        frame = background.copy()
+        cv2.rectangle(frame, (100 + shift, 80), (160 + shift, 150), (255, 200, 100), -1)
+        cv2.circle(frame, (130 + shift, 110), 10, (0, 0, 0), -1)
+        yield cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY) if grayscale else frame
+
+
+@pytest.mark.skipif(create_tracker() is None, reason="no KCF/MOSSE tracker in this OpenCV build")
+@pytest.mark.parametrize("grayscale", [False, True])
+def test_tracker_skips_detection_between_periodic_runs(grayscale):
+    tracker = FaceTracker(detect_every=5)
+    calls = []
+
+    def detect(frame):
+        calls.append(frame.shape)
+        return [FACE_BOX]
+
+    for frame in moving_face_frames(10, grayscale):
+        boxes = tracker.locate(frame, detect)
+        assert len(boxes) == 1
+
+    # One detection to start and one after detect_every tracked frames
+    assert len(calls) == 2
@@ -1,49 +1,77 @@
 import os
-import pandas as pd
+
+TRANSLATIONS_FILE = 'gate_project_translations.md'
+
+# Parsed translation tables: file path -> {language: tuple indexed by phrase ID}
+_tables = {}
+
+def parse_translation_table(file_path):
+    """
+    Parse the markdown translation table for all languages at once.
+    
+    Args:
+        file_path: Path to the translation markdown file, relative to this module
+    
+    Returns:
+        Dictionary mapping language codes to tuples where entry N is the
+        text of phrase ID N (None for IDs without a row)
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    full_path = os.path.join(script_dir, file_path)
+    
+    with open(full_path, 'r', encoding='utf-8') as f:
+        content = f.readlines()
+
+    headers = [h.strip() for h in content[0].split('|') if h.strip()]
+    languages = headers[1:]  # The first column is the phrase ID
+    rows = {}
+    for line in content[2:]:  # Skip the header separator line
+        row = [cell.strip() for cell in line.split('|') if cell.strip()]
+        if len(row) == len(headers) and row[0].isdigit():
+            rows[int(row[0])] = row[1:]
+
+    size = max(rows, default=0) + 1
+    table = {}
+    for column, lang in enumerate(languages):
+        texts = [None] * size
+        for phrase_id, texts_by_language in rows.items():
+            texts[phrase_id] = texts_by_language[column]
+        table[lang] = tuple(texts)
+    return table
 
 def load_translations(file_path, lang):
     """
     Load translations from the markdown file for the specified language.
     
+    The file is parsed once for all languages; later calls are a dictionary lookup.
+    
     Args:
         file_path: Path to the translation markdown file
         lang: Language code (EN, IT, RU, IL, HB)
     
     Returns:
-        Dictionary mapping phrase IDs to translations
+        Tuple of translations indexed by phrase ID
     """
     try:
         # Normalize Hebrew language code
         if lang == 'HB':
             lang = 'IL'
-            
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        full_path = os.path.join(script_dir, file_path)
         
-        with open(full_path, 'r', encoding='utf-8') as f:
-            content = f.readlines()
-
-        headers = [h.strip() for h in content[0].split('|') if h.strip()]
-        data = []
-        for line in content[2:]:  # Skip the header separator line
-            row = [cell.strip() for cell in line.split('|') if cell.strip()]
-            if len(row) == len(headers):
-                data.append(row)
-
-        df = pd.DataFrame(data, columns=headers)
+        if file_path not in _tables:
+            _tables[file_path] = parse_translation_table(file_path)
+        table = _tables[file_path]
         
-        # Check if the requested language exists, otherwise default to English
-        if lang not in df.columns:
-            print(f"Language '{lang}' not found. Available languages: {list(df.columns)}")
-            print(f"Defaulting to English.")
-            lang = 'EN'
+        # Check if the requested language exists, otherwise default to English.
+        # The fallback is remembered so the warning is printed once per language.
+        if lang not in table:
+            print(f"Language '{lang}' not found. Available languages: {list(table)}")
+            print("Defaulting to English.")
+            table[lang] = table['EN']
         
-        # Ensure all keys are strings
-        translations = dict(zip(df['Phrase ID'].astype(str), df[lang]))
-        return translations
+        return table[lang]
     except Exception as e:
         print(f"An error occurred while loading translations: {str(e)}")
-        return {}
+        return ()
 
 def get_message(phrase_id, translations):
     """
@@ -51,21 +79,23 @@ def get_message(phrase_id, translations):
     
     Args:
         phrase_id: The ID of the phrase to retrieve
-        translations: Dictionary of translations
+        translations: Translations tuple from load_translations
     
     Returns:
         Translated message or error message if not found
     """
-    # Convert phrase_id to string to ensure consistent lookup
-    phrase_id_str = str(phrase_id)
-    return translations.get(phrase_id_str, f"Missing translation for phrase ID {phrase_id}")
-
-# Cache for translations
-_translation_cache = {}
+    try:
+        index = int(phrase_id)
+        message = translations[index] if index >= 0 else None
+    except (IndexError, ValueError):
+        message = None
+    if message is None:
+        return f"Missing translation for phrase ID {phrase_id}"
+    return message
 
 def get_translations_cached(file_path, lang):
     """
-    Get translations with caching to improve performance.
+    Get translations for a language.
     This function accepts file_path for compatibility but always uses 'gate_project_translations.md'
     
     Args:
@@ -73,12 +103,6 @@ def get_translations_cached(file_path, lang):
         lang: Language code (EN, IT, RU, IL, HB)
     
     Returns:
-        Dictionary of translations
+        Tuple of translations indexed by phrase ID
     """
-    # Normalize Hebrew language code
-    if lang == 'HB':
-        lang = 'IL'
-        
-    if lang not in _translation_cache:
-        _translation_cache[lang] = load_translations('gate_project_translations.md', lang)
-    return _translation_cache[lang]
\ No newline at end of file
+    return load_translations(TRANSLATIONS_FILE, lang)